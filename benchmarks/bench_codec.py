@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+
+Micro-benchmark of the JSON codecs on representative category payloads.
+
+Measures encode and decode throughput of every installed codec for a batch of
+`cmdb.category.save` requests and a batch of `cmdb.category.read` responses,
+and the effect of gzip on the size of both.
+
+Usage: python benchmarks/bench_codec.py [--objects N] [--repeat N]
+"""
+
+import argparse
+import datetime
+import gzip
+import time
+
+from cmdb_idoit.codec import get_codec
+
+
+def category_read_response(objects):
+    """
+    A batch response of `cmdb.category.read` for C__CATG__GLOBAL and C__CATG__IP.
+    """
+    responses = list()
+    for i in range(objects):
+        responses.append({'id': "C__CATG__GLOBAL--%i" % i, 'jsonrpc': '2.0', 'result': [{
+            'id': str(i), 'objID': str(i), 'title': 'server%05i.example.com' % i,
+            'status': {'id': '2', 'title': 'Normal', 'const': 'C__RECORD_STATUS__NORMAL', 'title_lang': 'LC__CMDB__RECORD_STATUS__NORMAL'},
+            'created': '2017-07-18 12:14:31', 'created_by': 'admin', 'changed': '2019-03-01 08:00:12', 'changed_by': 'importer',
+            'purpose': {'id': '1', 'title': 'Production', 'const': 'C__PURPOSE__PRODUCTION', 'title_lang': 'LC__CMDB__PURPOSE__PRODUCTION'},
+            'category': [], 'sysid': 'SYSID_%010i' % i,
+            'cmdb_status': {'id': '6', 'title': 'in operation', 'const': 'C__CMDB_STATUS__IN_OPERATION', 'title_lang': 'LC__CMDB_STATUS__IN_OPERATION'},
+            'type': {'id': '5', 'title': 'Server', 'const': 'C__OBJTYPE__SERVER', 'title_lang': 'LC__CMDB__OBJTYPE__SERVER'},
+            'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 3,
+        }]})
+        responses.append({'id': "C__CATG__IP--%i" % i, 'jsonrpc': '2.0', 'result': [{
+            'id': str(i * 2 + n), 'objID': str(i), 'hostname': 'server%05i' % i,
+            'ipv4_address': {'ref_id': str(i), 'ref_title': '10.%i.%i.%i' % (n, i // 256 % 256, i % 256), 'ref_type': 'C__OBJTYPE__LAYER3_NET'},
+            'net_type': {'id': '1', 'title': 'IPv4', 'const': 'C__CATS_NET_TYPE__IPV4', 'title_lang': 'LC__CATS_NET_TYPE__IPV4'},
+            'primary': {'value': '1' if n == 0 else '0', 'title': 'Yes' if n == 0 else 'No'},
+            'active': {'value': '1', 'title': 'Yes'},
+            'dns_domain': [{'id': '1', 'title': 'example.com'}],
+        } for n in range(2)]})
+    return responses
+
+
+def category_save_request(objects):
+    """
+    A batch request of `cmdb.category.save` calls as build by :py:meth:`CMDBObject.save`.
+    """
+    requests = list()
+    for i in range(objects):
+        requests.append({'id': i, 'method': 'cmdb.category.save', 'version': '2.0', 'params': {
+            'objID': i, 'object': i, 'category': 'C__CATG__ACCOUNTING', 'apikey': 'abcdefgh',
+            'data': {'inventory_no': 'INV-%06i' % i, 'order_no': 'ORD-%06i' % i,
+                     'acquirementdate': datetime.datetime(2017, 7, 18, 12, 0),
+                     'price': 1234.5, 'contact': [1, 2, 3], 'description': 'Text ' * 40}}})
+    return requests
+
+
+def measure(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of the JSON codecs.')
+    parser.add_argument('--objects', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = { 'category.save request': category_save_request(args.objects),
+                 'category.read response': category_read_response(args.objects) }
+
+    codecs = list()
+    for name in ['json', 'orjson']:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print("Codec %s is not installed, skipping" % name)
+
+    print("%-24s %-8s %10s %12s %12s %10s" % ('payload', 'codec', 'size MiB', 'encode MiB/s', 'decode MiB/s', 'gzip MiB'))
+    for payload_name, payload in payloads.items():
+        for codec in codecs:
+            data = codec.encode(payload)
+            size = len(data) / (1024 * 1024)
+            encode = measure(lambda: codec.encode(payload), args.repeat)
+            decode = measure(lambda: codec.decode(data), args.repeat)
+            compressed = len(gzip.compress(data, compresslevel=5)) / (1024 * 1024)
+            print("%-24s %-8s %10.2f %12.1f %12.1f %10.2f" % (payload_name, codec.name, size, size / encode, size / decode, compressed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+
+Benchmark of the object and category load and save hot paths.
+
+Every instance size is measured in its own process against a stand-in server
+(see cmdb_idoit.tools.standin) running in a separate process. For each scenario
+the wall time, the number of HTTP requests and JSON-RPC calls of the client and
+the peak resident memory of the benchmark process are reported:
+
+  type_cold       get_cmdb_type for all types with empty caches
+  objects         construct CMDBObjects of all objects
+  load_category   CMDBObjects.loadCategoryData('C__CATG__GLOBAL')
+  load_all        CMDBObjects.loadAllCategoryData()
+  convert         decode the raw category entries of the first type with the
+                  decoders of the categories, calls are converted fields
+  save            CMDBObject.save after changing a single value and a multi
+                  value category of --save-objects objects
+
+The results are compared to the baselines in benchmarks/baselines/hotpaths.json.
+Request and call counts are deterministic and compared exactly, times and memory
+are compared with the given tolerance.
+
+Usage: python benchmarks/bench_hotpaths.py [--sizes 1000,10000,100000] [--save-baseline] [--check]
+
+The default sizes are 1k and 10k objects, 100k objects need several GiB of memory.
+"""
+
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import cmdb_idoit as cmdb
+from cmdb_idoit.category.category import CMDBCategoryValuesList
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'hotpaths.json')
+
+SCENARIOS = [ 'type_cold', 'objects', 'load_category', 'load_all', 'convert', 'save' ]
+
+
+def start_standin(objects, seed, latency):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([ sys.executable, '-m', 'cmdb_idoit.tools.standin', '--port', str(port),
+                                 '--objects', str(objects), '--seed', str(seed), '--latency', str(latency) ],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, "http://127.0.0.1:%i/src/jsonrpc.php" % port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise Exception("Stand-in server did not start")
+
+
+def peak_rss():
+    # ru_maxrss is given in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Measurement:
+
+    def __init__(self, client, results, name):
+        self.client = client
+        self.results = results
+        self.name = name
+        self.calls = None
+
+    def __enter__(self):
+        self.stats = dict(self.client.stats)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.start
+        self.results[self.name] = { 'wall': round(wall, 4),
+                                    'requests': self.client.stats['requests'] - self.stats['requests'],
+                                    'queries': self.client.stats['queries'] - self.stats['queries'],
+                                    'rss': round(peak_rss(), 1) }
+        if self.calls is not None:
+            self.results[self.name]['queries'] = self.calls
+
+
+def run_size(objects, save_objects, seed, latency):
+    """
+    Measure all scenarios for an instance with `objects` objects.
+    """
+    process, url = start_standin(objects, seed, latency)
+    results = dict()
+    try:
+        client = cmdb.CMDBClient(url, 'standin', 'standin', 'standin')
+        type_ids = [ int(t['id']) for t in client.request('cmdb.object_types', {}) ]
+
+        with Measurement(client, results, 'type_cold'):
+            for type_id in type_ids:
+                cmdb.get_cmdb_type(type_id, client)
+
+        with Measurement(client, results, 'objects'):
+            objects = cmdb.CMDBObjects(client=client)
+
+        with Measurement(client, results, 'load_category'):
+            objects.loadCategoryData('C__CATG__GLOBAL')
+
+        with Measurement(client, results, 'load_all'):
+            objects.loadAllCategoryData()
+
+        first_type = cmdb.get_cmdb_type(type_ids[0], client)
+        parameters = dict()
+        for obj in objects:
+            if obj.type == type_ids[0]:
+                for category_const in first_type.getCategories():
+                    parameters["%s--%i" % (category_const, obj.id)] = {'objID': obj.id, 'category': category_const}
+        raw = client.multi_requests('cmdb.category.read', parameters)
+        with Measurement(client, results, 'convert') as measurement:
+            conversions = 0
+            for key, entries in raw.items():
+                category = cmdb.get_category(key.split('--')[0], client=client)
+                for entry in entries:
+                    conversions += len(category.decoder.decode(entry))
+            measurement.calls = conversions
+        del raw
+
+        changed = list()
+        for obj in objects[:save_objects]:
+            obj['C__CATG__GLOBAL']['description'] = 'benchmark'
+            for category_const in obj.getTypeCategories():
+                values = obj[category_const]
+                if isinstance(values, CMDBCategoryValuesList) and len(values) > 0:
+                    values.append({ 'description': 'benchmark' } if values.category.hasField('description') else {})
+                    del values[0:1]
+                    break
+            changed.append(obj)
+        with Measurement(client, results, 'save'):
+            for obj in changed:
+                obj.save()
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def load_baselines():
+    try:
+        with open(BASELINES, 'r', encoding='utf8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict()
+
+
+def compare(result, baseline, tolerance):
+    """
+    Return the deviations of `result` from `baseline` which exceed the tolerance.
+    """
+    regressions = list()
+    for metric in ['requests', 'queries']:
+        if result[metric] > baseline[metric]:
+            regressions.append("%s %i > %i" % (metric, result[metric], baseline[metric]))
+    for metric in ['wall', 'rss']:
+        if result[metric] > baseline[metric] * (1 + tolerance) and result[metric] - baseline[metric] > 0.01:
+            regressions.append("%s %.2f > %.2f" % (metric, result[metric], baseline[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the object and category hot paths.')
+    parser.add_argument('--sizes', default='1000,10000', help='comma separated numbers of objects')
+    parser.add_argument('--save-objects', type=int, default=1000, help='number of objects saved')
+    parser.add_argument('--latency', type=float, default=0.0, help='latency of the stand-in server')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative increase of time and memory')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as new baselines')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on regressions')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        json.dump(run_size(args.run_size, args.save_objects, args.seed, args.latency), sys.stdout)
+        return
+
+    baselines = load_baselines()
+    regressed = False
+    print("%8s %-14s %9s %9s %9s %9s  %s" % ('objects', 'scenario', 'wall s', 'requests', 'calls', 'rss MiB', 'baseline'))
+    for size in [ int(s) for s in args.sizes.split(',') ]:
+        output = subprocess.run([ sys.executable, os.path.abspath(__file__), '--run-size', str(size),
+                                  '--save-objects', str(args.save_objects), '--seed', str(args.seed),
+                                  '--latency', str(args.latency) ],
+                                stdout=subprocess.PIPE, check=True).stdout
+        results = json.loads(output)
+        for scenario in SCENARIOS:
+            result = results[scenario]
+            baseline = baselines.get(str(size), {}).get(scenario)
+            if baseline is None:
+                note = '-'
+            else:
+                regressions = compare(result, baseline, args.tolerance)
+                regressed = regressed or len(regressions) > 0
+                note = 'REGRESSION ' + ', '.join(regressions) if regressions else 'ok (%+.0f%% wall)' % ((result['wall'] / baseline['wall'] - 1) * 100 if baseline['wall'] else 0)
+            print("%8i %-14s %9.3f %9i %9i %9.1f  %s" % (size, scenario, result['wall'], result['requests'], result['queries'], result['rss'], note))
+        if args.save_baseline:
+            baselines[str(size)] = results
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINES), exist_ok=True)
+        with open(BASELINES, 'w', encoding='utf8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.check and regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+
+Benchmark of the memory used by the category values of objects.
+
+The category values of --objects objects of a stand-in instance with --categories
+categories per type are built twice: with the slot based CMDBCategoryValues and
+with the dict based layout used before, which is reproduced in LegacyCategoryValues.
+Measured with tracemalloc are the bytes of the empty structures, as built for every
+object by CMDBType.getObjectStructure, and of the structures after the loaded rows
+have been filled in. The rows are decoded up front and are not part of the measurement.
+
+Usage: python benchmarks/bench_memory.py [--objects 2000] [--categories 40]
+"""
+
+import argparse
+import tracemalloc
+
+import cmdb_idoit as cmdb
+from cmdb_idoit.category.category import CMDBCategoryValues, CMDBCategoryValuesList
+from cmdb_idoit.tools.standin import StandinServer
+from cmdb_idoit.tools.synthetic import SyntheticInstance
+
+
+class LegacyCategoryValues:
+    """
+    The layout of CMDBCategoryValues before the field ordinals: a dict of values,
+    a dict of change states and the field types of every instance.
+    """
+
+    def __init__(self, category):
+        self.id = None
+        self.category = category
+        self.field_type = category.getFieldTypes()
+        self.field_data = dict()
+        self._change_state = dict()
+        self.markUnchanged()
+
+    def _fill_decoded_data(self, row_id, data):
+        self.id = row_id
+        self.field_data.update(data)
+        self.markUnchanged()
+
+    def markUnchanged(self):
+        for key in self.category.getFields():
+            self._change_state[key] = False
+
+
+class LegacyCategoryValuesList:
+
+    def __init__(self, category):
+        self.category = category
+        self.items = list()
+        self.deleted_items = list()
+
+    def _append_decoded(self, row_id, data):
+        value = LegacyCategoryValues(self.category)
+        value._fill_decoded_data(row_id, data)
+        self.items.append(value)
+
+
+def build_structure(type_categories, values_class, list_class):
+    return { category.const: list_class(category) if multi_value else values_class(category)
+             for category, multi_value in type_categories }
+
+
+def fill_structure(structure, rows):
+    for category_const, multi_value, decoded in rows:
+        values = structure[category_const]
+        for row_id, data in decoded:
+            if multi_value:
+                values._append_decoded(row_id, data)
+            else:
+                values._fill_decoded_data(row_id, data)
+
+
+def measure(objects, values_class, list_class):
+    """
+    Return the traced bytes of the empty and of the filled structures of all `objects`.
+    """
+    tracemalloc.start()
+    structures = [ build_structure(type_categories, values_class, list_class) for type_categories, rows in objects ]
+    empty = tracemalloc.get_traced_memory()[0]
+    for structure, (type_categories, rows) in zip(structures, objects):
+        fill_structure(structure, rows)
+    filled = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return empty, filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the memory used by the category values of objects.')
+    parser.add_argument('--objects', type=int, default=2000, help='number of objects')
+    parser.add_argument('--categories', type=int, default=40, help='number of categories of each type')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    instance = SyntheticInstance(objects=args.objects, categories_per_type=args.categories, seed=args.seed)
+    with StandinServer(instance) as server:
+        client = server.client()
+        cmdb.preload_types(client=client)
+        objects = list()
+        for raw_object in instance.call('cmdb.objects', {'filter': {}}):
+            cmdb_type = cmdb.get_cmdb_type(int(raw_object['type']), client)
+            inclusions = [ cmdb_type.get_category_inclusion(category_const) for category_const in cmdb_type.getCategories() ]
+            type_categories = [ (inclusion.category, inclusion.multi_value) for inclusion in inclusions ]
+            rows = list()
+            for category, multi_value in type_categories:
+                result = instance.call('cmdb.category.read', {'objID': int(raw_object['id']), 'category': category.const})
+                rows.append((category.const, multi_value, [ (row['id'], category.decoder.decode(row)) for row in result ]))
+            objects.append((type_categories, rows))
+
+    legacy = measure(objects, LegacyCategoryValues, LegacyCategoryValuesList)
+    compact = measure(objects, CMDBCategoryValues, CMDBCategoryValuesList)
+
+    print("%i objects, %i category values" % (len(objects), sum(len(type_categories) for type_categories, rows in objects)))
+    print("%-8s %14s %14s" % ('layout', 'empty KiB', 'filled KiB'))
+    print("%-8s %14.0f %14.0f" % ('legacy', legacy[0] / 1024, legacy[1] / 1024))
+    print("%-8s %14.0f %14.0f" % ('compact', compact[0] / 1024, compact[1] / 1024))
+    print("%-8s %13.1fx %13.1fx" % ('ratio', legacy[0] / compact[0], legacy[1] / compact[1]))
+
+
+if __name__ == '__main__':
+    main()
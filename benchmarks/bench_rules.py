@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+
+Benchmark of the type mapping rules of the shipped maps.
+
+For every category of a map one row is built, holding a value shaped like the
+JSON path of each rule of the category. Each row is matched by all rules of its
+category, once with jsonpath_ng as done before the rules were compiled and once
+with the compiled getters. Both have to return the same values. Reported are the
+microseconds per row and the speedup for each map.
+
+Usage: python benchmarks/bench_rules.py [--repeat 20]
+"""
+
+import argparse
+import time
+
+import jsonpath_ng
+
+from cmdb_idoit.category.value_factory import _load_rules, _PATH_STEP, _SIMPLE_PATH
+
+MAPS = [ '1_9', '1_11', '1_12', '1_13' ]
+
+
+def sample_value(path):
+    """
+    Build a value matched by `path`, with some noise next to the matched fields.
+    """
+    match = _SIMPLE_PATH.match(path)
+    if match is None:
+        return { 'latitude': 52.5, 'longitude': 13.4, 'title': 'noise' }
+    value = 42
+    for step in reversed(list(_PATH_STEP.finditer(match.group(1)))):
+        if step.group(1) is None:
+            value = [ value, value, value ]
+        else:
+            value = { step.group(1): value, 'title': 'noise', 'const': 'C__NOISE' }
+    return value
+
+
+def build_rows(rules):
+    rows = list()
+    for category_const, fields in sorted(rules.items()):
+        row = [ (rule, sample_value(rule['path'])) for rule in fields.values() ]
+        rows.append(row)
+    return rows
+
+
+def measure(rows, apply_rule, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            for rule, value in row:
+                apply_rule(rule, value)
+    return (time.perf_counter() - start) / (repeat * len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the type mapping rules of the shipped maps.')
+    parser.add_argument('--repeat', type=int, default=20, help='number of passes over all rows')
+    args = parser.parse_args()
+
+    expressions = dict()
+    def apply_jsonpath(rule, value):
+        path = rule['path']
+        if path not in expressions:
+            expressions[path] = jsonpath_ng.parse(path)
+        return [ match.value for match in expressions[path].find(value) ]
+
+    def apply_compiled(rule, value):
+        return rule['getter'](value)
+
+    print("%-6s %6s %6s %14s %14s %8s" % ('map', 'rows', 'rules', 'jsonpath us', 'compiled us', 'speedup'))
+    for version in MAPS:
+        rules = _load_rules(version)
+        rows = build_rows(rules)
+        for row in rows:
+            for rule, value in row:
+                if apply_jsonpath(rule, value) != apply_compiled(rule, value):
+                    raise Exception("Compiled rule %s differs from jsonpath_ng" % rule['path'])
+        jsonpath_time = measure(rows, apply_jsonpath, args.repeat)
+        compiled_time = measure(rows, apply_compiled, args.repeat)
+        print("%-6s %6i %6i %14.1f %14.1f %7.1fx" % (version, len(rows), sum(len(row) for row in rows),
+                                                    jsonpath_time * 1e6, compiled_time * 1e6, jsonpath_time / compiled_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -19,4 +19,6 @@ from .session import *
 from .category import *
 from .type import *
 from .object import *
+from .query import *
 from .dialog import *
+from .frame import *
@@ -0,0 +1,247 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import logging
+import ssl
+import time
+
+from . import wirelog
+from .exceptions import CMDBHTTPError, CMDBSessionExpired
+from .session import get_client, _check_session_result, _check_session_status, _fan_out, _join_calls, _method_parameters, _process_results, _validate_response
+
+# Maximal number of connections the asyncio client keeps open to the i-doit instance.
+# Requests beyond this limit are queued until a connection becomes free.
+connection_limit = 16
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError("The asyncio client requires aiohttp, install cmdb_idoit[async]") from e
+    return aiohttp
+
+
+def _ssl_context(client):
+    verify = client.session.verify
+    if verify is True:
+        return None
+    elif not verify:
+        return False
+    else:
+        return ssl.create_default_context(cafile=verify)
+
+
+def _get_session(client):
+    """
+    Return the aiohttp client session of `client` for the running event loop.
+
+    The aiohttp session reuses the authentication of the client, hence the client
+    has to be logged in beforehand.
+    """
+    loop = asyncio.get_running_loop()
+    if client._aio_session is None or client._aio_session.closed or client._aio_loop is not loop:
+        aiohttp = _import_aiohttp()
+        auth = None
+        if client.session.auth is not None:
+            auth = aiohttp.BasicAuth(client.username, client.password)
+        connector = aiohttp.TCPConnector(limit=connection_limit, ssl=_ssl_context(client))
+        client._aio_session = aiohttp.ClientSession(headers=dict(client.session.headers), auth=auth, connector=connector)
+        client._aio_loop = loop
+    return client._aio_session
+
+
+async def close(client=None):
+    """
+    Close the connections of the asyncio client.
+    """
+    client = get_client(client)
+    if client._aio_session is not None and not client._aio_session.closed:
+        await client._aio_session.close()
+    client._aio_session = None
+    client._aio_loop = None
+
+
+async def request(method, parameters, client=None):
+    """
+    Asynchronous variant of :py:func:`cmdb_idoit.request`.
+    """
+    if not type(parameters) is dict:
+        raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+    results = await _request(get_client(client), { '1' : { 'method': method, 'parameter': parameters}},True)
+
+    if '1' in results:
+        return results['1']
+    else:
+        return None
+
+
+async def multi_requests(method, parameters, client=None):
+    """
+    Asynchronous variant of :py:func:`cmdb_idoit.multi_requests`.
+    """
+    if not type(parameters) is dict:
+        raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+    if len(parameters) == 0:
+        return {}
+
+    return await multi_method_request(_method_parameters(method, parameters), client=client)
+
+
+async def multi_method_request(parameters,store_errors=False,client=None):
+    """
+    Asynchronous variant of :py:func:`cmdb_idoit.multi_method_request`.
+
+    At most `concurrency` batches of the client are in flight at the same time.
+    Every batch is sized when it is sent, after the batch sizer has seen the outcome
+    of the preceding batches.
+    """
+    client = get_client(client)
+    unique, duplicates = client._deduplicate(parameters)
+    calls = client._encode_calls(unique)
+    if len(calls) == 0:
+        return {}
+
+    slots = asyncio.Semaphore(client.concurrency)
+    failed = list()
+    tasks = list()
+    batches = client.batch_sizer.split(calls)
+    try:
+        while len(failed) == 0:
+            await slots.acquire()
+            batch = next(batches, None)
+            if batch is None:
+                slots.release()
+                break
+            tasks.append(asyncio.ensure_future(_send_limited(client,slots,failed,batch,store_errors)))
+        sub_results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    result = dict()
+    for sub_result in sub_results:
+        result.update(sub_result)
+    return _fan_out(parameters, result, duplicates)
+
+
+async def _send_limited(client,slots,failed,calls,store_errors):
+    try:
+        return await _send_batch(client,calls,False,store_errors)
+    except BaseException:
+        # Don't send the remaining batches
+        failed.append(calls)
+        raise
+    finally:
+        slots.release()
+
+
+async def _request(client,parameters,raise_errors,store_errors=False):
+    calls = client._encode_calls(parameters)
+    if len(calls) == 0:
+        return {}
+    return await _send_batch(client,calls,raise_errors,store_errors)
+
+
+async def _send_batch(client,calls,raise_errors,store_errors,renew=True):
+    start = time.monotonic()
+    try:
+        result = await _post(client,calls,raise_errors,store_errors)
+    except CMDBSessionExpired as e:
+        if not renew:
+            raise e
+        # The login is done by the synchronous session
+        await asyncio.get_running_loop().run_in_executor(None, client._renew_session, e.session_id)
+        return await _send_batch(client,calls,raise_errors,store_errors,False)
+    except CMDBHTTPError as e:
+        if not client._is_bisectable(e, calls):
+            raise e
+        client._record_bisection(e, calls)
+        half = len(calls) // 2
+        result = await _send_batch(client,calls[:half],raise_errors,store_errors,renew)
+        result.update(await _send_batch(client,calls[half:],raise_errors,store_errors,renew))
+        return result
+    client.batch_sizer.record(len(calls), time.monotonic() - start)
+    return result
+
+
+async def _post(client,calls,raise_errors,store_errors):
+    aio_session = _get_session(client)
+    body = _join_calls(calls)
+    batch_id = wirelog.sample()
+    if batch_id is not None:
+        wirelog.record(batch_id, 'request', body, calls=len(calls))
+
+    data, headers = client._compress(body)
+    # The session id might have been renewed after the aiohttp session was created
+    session_id = client._session_id()
+    if session_id is not None:
+        headers = dict(headers or {}, **{'X-RPC-Auth-Session': session_id})
+    start = time.monotonic()
+    async with aio_session.post(client.url, data=data, headers=headers) as response:
+        logging.debug("HTTP Response Header: %r", response.headers)
+        content = await response.read()
+        client._count_request(len(calls))
+        if batch_id is not None:
+            wirelog.record(batch_id, 'response', content, status=response.status, elapsed=round(time.monotonic() - start, 6))
+        _check_session_status(response.status, session_id)
+        _validate_response(response.status, response.headers, content)
+
+    res_jsons = client._decode_response(content)
+    _check_session_result(res_jsons, session_id)
+    return _process_results(res_jsons,raise_errors,store_errors)
+
+
+async def load_objects(filters=None, limit=0, client=None):
+    """
+    Asynchronous variant of :py:class:`cmdb_idoit.CMDBObjects`.
+
+    Type informations which are not cached yet are loaded at once by the synchronous
+    session in an executor, see :py:func:`cmdb_idoit.preload_types`.
+
+    :param dict filters: Definition of the objects list filter.
+    :param int limit: Number of objects which should be loaded.
+
+    :rtype: CMDBObjects
+    """
+    from cmdb_idoit.object import CMDBObjects
+    from cmdb_idoit.type import preload_types
+
+    client = get_client(client)
+    result = await request('cmdb.objects', CMDBObjects._build_parameter(filters, limit), client)
+
+    type_ids = sorted(set( int(raw_object['type']) for raw_object in result ))
+    missing = [ type_id for type_id in type_ids if type_id not in client.type_cache ]
+    if len(missing) > 0:
+        await asyncio.get_running_loop().run_in_executor(None, preload_types, missing, client)
+
+    return CMDBObjects(filters, limit, result=result, client=client)
+
+
+async def load_object(ident, client=None):
+    """
+    Asynchronous variant of :py:func:`cmdb_idoit.loadObject`.
+    """
+    objects = await load_objects({'ids': [ident]}, client=client)
+    if len(objects) == 0:
+        return None
+    else:
+        return objects.pop()
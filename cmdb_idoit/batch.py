@@ -0,0 +1,123 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import threading
+
+
+class AdaptiveBatchSizer:
+    """
+    Split bulk requests into batches sized by the serialized request bytes and
+    the observed response time of previous batches.
+
+    A batch is closed when either the number of calls reaches the current call limit
+    or the next call would exceed `max_bytes`. The call limit grows while batches are
+    answered well below `target_latency` and shrinks when they take longer or fail.
+
+    The size of a batch which failed as a whole is remembered as `ceiling`, the call
+    limit stays well below it and doesn't grow at all for `hold_batches` batches after
+    the failure. The ceiling rises by one call per successful batch, so a larger size is
+    tried again once the failure lies far enough back. Each further failure at or above
+    the ceiling halves the rate at which it rises.
+
+    :ivar int max_bytes: Upper bound for the serialized size of a batch.
+    :ivar float target_latency: Desired response time of a batch in seconds.
+    :ivar int min_calls: Lower bound for the call limit.
+    :ivar int max_calls: Upper bound for the call limit.
+    :ivar int calls: Current call limit.
+    :ivar int ceiling: Size of the last failed batch, None if none failed.
+    :ivar int hold_batches: Number of batches without growth after a failure.
+    """
+
+    def __init__(self, initial_calls=512, min_calls=1, max_calls=4096, max_bytes=1024 * 1024, target_latency=10.0,
+                 hold_batches=16):
+        self.min_calls = min_calls
+        self.max_calls = max_calls
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.calls = initial_calls
+        self.ceiling = None
+        self.hold_batches = hold_batches
+        self._hold = 0
+        self._successes = 0
+        self._decay_batches = 1
+        self._lock = threading.Lock()
+
+    def split(self, calls):
+        """
+        Split the given calls lazily into batches.
+
+        :param list calls: list of `(key, encoded_call, method)` tuples
+        :rtype: generator of lists
+        """
+        batch = list()
+        batch_bytes = 0
+        limit = self.calls
+        for call in calls:
+            size = len(call[1]) + 1
+            if len(batch) > 0 and (len(batch) >= limit or batch_bytes + size > self.max_bytes):
+                yield batch
+                batch = list()
+                batch_bytes = 0
+                limit = self.calls
+            batch.append(call)
+            batch_bytes += size
+        if len(batch) > 0:
+            yield batch
+
+    def record(self, calls, seconds):
+        """
+        Adapt the call limit to the response time of a successful batch.
+
+        :param int calls: number of calls in the batch
+        :param float seconds: response time of the batch
+        """
+        with self._lock:
+            if self.ceiling is not None:
+                # Forget the failure slowly, the more often batches failed the slower
+                self._successes += 1
+                if self._successes >= self._decay_batches:
+                    self._successes = 0
+                    self.ceiling += 1
+                    if self.ceiling > self.max_calls:
+                        self.ceiling = None
+                        self._decay_batches = 1
+            if seconds > self.target_latency:
+                self.calls = max(self.min_calls, min(self.calls, int(calls * self.target_latency / seconds)))
+                logging.debug("Batch of %i calls took %.2fs, reduce batch size to %i" % (calls, seconds, self.calls))
+            elif self._hold > 0:
+                self._hold -= 1
+            elif seconds < self.target_latency / 2 and calls >= self.calls:
+                limit = self.max_calls
+                if self.ceiling is not None:
+                    # Stay clear of the size which failed
+                    limit = min(limit, self.ceiling * 3 // 4)
+                self.calls = max(self.calls, min(limit, int(self.calls * 1.5) + 1))
+
+    def record_failure(self, calls):
+        """
+        Halve the call limit after a batch failed as a whole and remember its size.
+
+        :param int calls: number of calls in the failed batch
+        """
+        with self._lock:
+            self.calls = max(self.min_calls, min(self.calls, calls // 2))
+            if self.ceiling is not None and calls >= self.ceiling:
+                self._decay_batches *= 2
+            self.ceiling = calls if self.ceiling is None else min(self.ceiling, calls)
+            self._successes = 0
+            self._hold = self.hold_batches
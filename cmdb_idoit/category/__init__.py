@@ -17,14 +17,14 @@
 
 import textwrap
 
-from cmdb_idoit.session import multi_requests
+from cmdb_idoit.session import get_client
 from cmdb_idoit.exceptions import CMDBNoneAPICategory, CMDBRequestError
 from cmdb_idoit.category.value_factory import *
 
 from cmdb_idoit.category.cache import cmdbCategoryCache, is_categorie_cached
 from cmdb_idoit.category.category import CMDBCategory, CMDBCategoryType
 
-def get_category(category_const, category_id=None, category_type=CMDBCategoryType.type_specific):
+def get_category(category_const, category_id=None, category_type=CMDBCategoryType.type_specific, client=None):
     """
     Returns a `CMDBCategory` object iff a identifiable object is in `CMDBCategoryCache`.
     A object is identifiable if category_const is either the constant for that `CMDBCategory`
@@ -39,30 +39,39 @@ def get_category(category_const, category_id=None, category_type=CMDBCategoryTyp
 
     Should there be no cached `CMDBCategory` and category_id is not given then the result is None.
     """
-    if is_categorie_cached(category_const):
-        return cmdbCategoryCache[category_const]
-    elif cmdbCategoryCache.isNoneAPICategory(category_const):
+    client = get_client(client)
+    if is_categorie_cached(category_const, client):
+        return client.category_cache[category_const]
+    elif client.category_cache.isNoneAPICategory(category_const):
         raise CMDBNoneAPICategory(f"Category { category_const } cannot be handled by API, cached result!")
     elif category_id:
-        return __load_category(category_id, category_const, category_type)
+        return __load_category(category_id, category_const, category_type, client=client)
     else:
-        return __load_category(None,category_const,CMDBCategoryType.type_custom)
+        return __load_category(None,category_const,CMDBCategoryType.type_custom, client=client)
 
 
-def is_categorie_cached(category_const):
+def is_categorie_cached(category_const, client=None):
     """
     Check if the category is cached.
     """
-    return category_const in cmdbCategoryCache
+    return category_const in get_client(client).category_cache
 
 
-def fetch_categories(categories):
+def fetch_categories(categories, client=None):
     """
     Fetches a list of categories in one bulk request.
     Returns a list of requested categories.
+
+    Global, specific and custom categories are requested with separate keys, as their
+    numerical idents overlap. Categories the API cannot handle are remembered as such.
     """
+    client = get_client(client)
     parameters = dict()
     for categorie in categories:
+        if client.category_cache.isNoneAPICategory(categorie['const']):
+            continue
+        if is_categorie_cached(categorie['const'], client) or _is_metadata_cached(categorie, client):
+            continue
         parameter = dict()
         if categorie['global'] == CMDBCategoryType.type_global:
             parameter['catgID'] = categorie['id']
@@ -70,42 +79,60 @@ def fetch_categories(categories):
             parameter['catsID'] = categorie['id']
         else:
             parameter['category'] = categorie['const'];
-        if not is_categorie_cached(categorie['const']):
-            key = str(categorie['id'])
-            if categorie['global'] == CMDBCategoryType.type_custom:
-                key = 'c' + str(categorie['id'])
-            parameters[key] = parameter
+        parameters[_category_key(categorie)] = {'method': 'cmdb.category_info', 'parameter': parameter}
 
     results = dict()
     if len(parameters) > 0:
-        results = multi_requests('cmdb.category_info', parameters)
+        results = client.multi_method_request(parameters, store_errors=True)
 
     fetched = list()
     for categorie in categories:
-        key = str(categorie['id'])
-        if categorie['global'] == CMDBCategoryType.type_custom:
-            key = 'c' + str(categorie['id'])
-        if key in results:
-            category_object = __load_category(categorie['id'], categorie['const'], categorie['global'], results[key])
+        result = results.get(_category_key(categorie))
+        if isinstance(result, CMDBRequestError):
+            if result.errnr == -32099 and not client.category_cache.isNoneAPICategory(categorie['const']):
+                _set_none_api_category(categorie['const'], client)
+        elif result is not None:
+            category_object = __load_category(categorie['id'], categorie['const'], categorie['global'], result, client=client)
             fetched.append(category_object)
-        elif is_categorie_cached(categorie['const']):
-                fetched.append(get_category(categorie['const']))
+        elif is_categorie_cached(categorie['const'], client):
+            fetched.append(get_category(categorie['const'], client=client))
+        elif _is_metadata_cached(categorie, client):
+            fetched.append(__load_category(categorie['id'], categorie['const'], categorie['global'], client=client))
 
     return fetched
 
-def __load_category(ident,const,*vargs,**kargs):
+def _category_key(categorie):
+    if categorie['global'] == CMDBCategoryType.type_global:
+        return 'g%s' % categorie['id']
+    elif categorie['global'] == CMDBCategoryType.type_specific:
+        return 's%s' % categorie['id']
+    return 'c%s' % categorie['const']
+
+def _set_none_api_category(const, client):
+    logging.warning(f"Category { const } cannot be handled by API.")
+    client.category_cache.setNoneAPICategory(const)
+    if client.metadata is not None:
+        client.metadata.add_none_api_category(const)
+
+def _is_metadata_cached(categorie, client):
+    if client.metadata is None:
+        return False
+    kind = categorie['global'].name[len('type_'):]
+    return client.metadata.get_category(kind, categorie['id'], categorie['const']) is not None
+
+def __load_category(ident,const,*vargs,client=None,**kargs):
+    client = get_client(client)
     try:
-        category_object = CMDBCategory(ident,const,*vargs,**kargs)
-        if not is_categorie_cached(category_object.const):
+        category_object = CMDBCategory(ident,const,*vargs,client=client,**kargs)
+        if not is_categorie_cached(category_object.const, client):
             if category_object.id != None:
                 logging.debug('Caching category %s' % category_object.const)
-                cmdbCategoryCache[category_object.const] = category_object
+                client.category_cache[category_object.const] = category_object
             else:
                 logging.debug('Not caching category %s' % category_object.const)
         return category_object
     except CMDBRequestError as e:
         if e.errnr == -32099:
-            logging.warning(f"Category { const } cannot be handled by API.")
-            cmdbCategoryCache.setNoneAPICategory(const)
+            _set_none_api_category(const, client)
             raise CMDBNoneAPICategory(e.message)
 
@@ -15,6 +15,7 @@
     along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
 """
 from cmdb_idoit.category.category import CMDBCategory
+from cmdb_idoit.session import default_client, get_client
 
 class CMDBCategoryCache(dict):
     """
@@ -47,10 +48,10 @@ class CMDBCategoryCache(dict):
         self.none_api_category.append(key)
 
 
-cmdbCategoryCache = CMDBCategoryCache()
+cmdbCategoryCache = default_client.category_cache
 
-def is_categorie_cached(category_const):
+def is_categorie_cached(category_const, client=None):
     """
     Check if the category is cached.
     """
-    return category_const in cmdbCategoryCache
+    return category_const in get_client(client).category_cache
@@ -18,16 +18,15 @@
 from enum import Enum
 import logging
 import collections.abc
+import functools
+import sys
+import textwrap
+import types
 
-from cmdb_idoit.session import request, requests
+from cmdb_idoit.session import get_client
 from cmdb_idoit.exceptions import CMDBNoneAPICategory, CMDBMissingTypeInformation, CMDBConversionException
 from cmdb_idoit.category.value_factory import type_determination, value_representation_factory
-
-def getCategoryValueObject(category,multi_value):
-    if multi_value:
-        return CMDBCategoryValuesList(category)
-    else:
-        return CMDBCategoryValues(category)
+from cmdb_idoit.category.conversion import conver_list, conver_column
 
 def getCategoryValueObject(category,multi_value):
     if multi_value:
@@ -53,13 +52,17 @@ class CMDBCategory:
     """
     
 
-    def __init__(self, category_id, category_const, category_type, result=None):
+    def __init__(self, category_id, category_const, category_type, result=None, client=None):
+        self.client = get_client(client)
         self.id = int(category_id)
         self.const = category_const
         self.category_type = category_type
         self.custom_category = False
         self.fields = dict()
         self.field_type = dict()
+        self.field_names = list()
+        self.field_index = dict()
+        self._decoder = None
 
         parameter = dict()
         if self.is_global_category():
@@ -69,11 +72,19 @@ class CMDBCategory:
         else:
             parameter['category'] = self.const
 
+        # The metadata cache identifies categories by their kind
+        kind = category_type.name[len('type_'):]
+        metadata = self.client.metadata
+        if result is None and metadata is not None:
+            result = metadata.get_category(kind, self.id, self.const)
         if result is None:
-            result = request('cmdb.category_info', parameter)
+            result = self.client.request('cmdb.category_info', parameter)
+        if metadata is not None and type(result) is dict:
+            metadata.set_category(kind, self.id, self.const, result)
 
         if type(result) is dict:
-            self.fields = result
+            # Field names are shared by the values of all objects
+            self.fields = { sys.intern(key): value for key, value in result.items() }
 
         # Determine types for all fields
         for key in list(self.getFields()):
@@ -84,6 +95,10 @@ class CMDBCategory:
                 logging.debug(e)
                 del self.fields[key]
 
+        # Ordinals of the fields, values of the category are stored in this order
+        self.field_names = list(self.fields)
+        self.field_index = { key: ordinal for ordinal, key in enumerate(self.field_names) }
+
     def get_id(self):
         """
         Get the numerical identifier of a category.
@@ -109,6 +124,10 @@ class CMDBCategory:
         return self.fields.keys()
 
     def getFieldType(self, index):
+        """
+        Return the type for a field, determinated by `cmdb_idoit.category.type_determination`
+        when the category was loaded.
+        """
         return self.field_type[index]
 
     def getFieldTypes(self):
@@ -135,11 +154,15 @@ class CMDBCategory:
         """
         return self.fields[index]['info']['type']
 
-    def getFieldType(self, index):
+
+    @property
+    def decoder(self):
         """
-        Return the type for a field, determinated by `cmdb_idoit.category.type_determination`.
+        The :py:class:`CMDBCategoryDecoder` converting raw rows of this category.
         """
-        return type_determination(self, index)
+        if self._decoder is None:
+            self._decoder = CMDBCategoryDecoder(self)
+        return self._decoder
 
     def is_global_category(self):
         """
@@ -161,11 +184,168 @@ class CMDBCategory:
 
 
 
+class CMDBCategoryDecoder:
+    """
+    Converts the raw rows of `cmdb.category.read` of one category in a single pass.
+
+    The plan is determined once from the field types and the type mapping rules of the
+    category. It holds for each field, in the order of the fields, the key, the conversion
+    function, the compiled rule path or None, and whether the field is a list.
+
+    Many rows are converted a column at a time by :py:meth:`decode_rows`.
+    """
+
+    def __init__(self, category):
+        self.category = category
+        self.plan = list()
+        for key, attr_type in category.getFieldTypes().items():
+            is_list = bool(attr_type.isList())
+            if is_list:
+                convert = functools.partial(conver_list, attr_type.conversion_function)
+            else:
+                convert = attr_type.conversion_function
+            getter = attr_type.rule['getter'] if attr_type.hasRule() else None
+            self.plan.append((key, convert, getter, is_list))
+        self.conversion_functions = { key: attr_type.conversion_function for key, attr_type in category.getFieldTypes().items() }
+
+    def decode(self, row):
+        """
+        Return the representations of all fields of the category contained in `row`,
+        like :py:func:`cmdb_idoit.category.value_factory.value_representation_factory`.
+        """
+        data = dict()
+        for key, convert, getter, is_list in self.plan:
+            if key not in row:
+                continue
+            value = row[key]
+            try:
+                # Weird empty values check
+                if value == False:
+                    value = None
+                elif type(value) is list and (len(value) == 0 or (len(value) == 1 and type(value[0]) is list and len(value[0]) == 0)):
+                    value = None
+
+                if getter is None or value is None:
+                    data[key] = convert(value)
+                    continue
+                matches = getter(value)
+                if is_list and len(matches) > 0:
+                    data[key] = convert(matches)
+                elif not is_list and len(matches) == 1:
+                    data[key] = convert(matches[0])
+                else:
+                    # Reports the mismatch of the rule
+                    data[key] = value_representation_factory(self.category, key, row[key])
+            except CMDBConversionException as e:
+                _log_conversion_error(self.category, key, row[key], e)
+                raise e
+        return data
+
+
+    def decode_rows(self, rows):
+        """
+        Return the representations of many rows, like :py:meth:`decode` for each row.
+
+        The values of a field are converted for all rows in one call, see
+        :py:func:`cmdb_idoit.category.conversion.conver_column`, which converts
+        repeated values once and detects date formats once for all rows.
+        """
+        decoded = [ dict() for row in rows ]
+        for entry in self.plan:
+            key = entry[0]
+            indexes, values = self._decode_column(rows, entry)
+            for index, value in zip(indexes, values):
+                decoded[index][key] = value
+        return decoded
+
+    def decode_columns(self, rows, fields=None):
+        """
+        Return the representations of many rows as columns, a dict of lists by field.
+        Values of fields missing in a row are None.
+
+        :param list fields: fields to decode, by default all fields of the category
+        """
+        columns = dict()
+        for entry in self.plan:
+            key = entry[0]
+            if fields is not None and key not in fields:
+                continue
+            indexes, values = self._decode_column(rows, entry)
+            if len(indexes) == len(rows):
+                columns[key] = values
+            else:
+                column = [ None ] * len(rows)
+                for index, value in zip(indexes, values):
+                    column[index] = value
+                columns[key] = column
+        return columns
+
+    def _decode_column(self, rows, entry):
+        """
+        Return the indexes of the rows containing a field of the plan and the converted values.
+        """
+        key, convert, getter, is_list = entry
+        indexes = list()
+        values = list()
+        for index, row in enumerate(rows):
+            if key not in row:
+                continue
+            value = row[key]
+            value_type = type(value)
+            # Weird empty values check
+            if value_type is list:
+                if len(value) == 0 or (len(value) == 1 and type(value[0]) is list and len(value[0]) == 0):
+                    value = None
+            elif value_type is not dict and value_type is not str and value == False:
+                value = None
+
+            if getter is not None and value is not None:
+                matches = getter(value)
+                if is_list and len(matches) > 0:
+                    value = matches
+                elif not is_list and len(matches) == 1:
+                    value = matches[0]
+                else:
+                    # Reports the mismatch of the rule and raises
+                    value = value_representation_factory(self.category, key, row[key])
+            indexes.append(index)
+            values.append(value)
+
+        if len(values) == 0:
+            return indexes, values
+        try:
+            return indexes, conver_column(self.conversion_functions[key], values, is_list)
+        except CMDBConversionException as e:
+            # Find the row of the failing value for the report
+            for index, value in zip(indexes, values):
+                try:
+                    convert(value)
+                except CMDBConversionException as row_error:
+                    _log_conversion_error(self.category, key, rows[index][key], row_error)
+                    raise row_error
+            raise e
+
+
+def _log_conversion_error(category, key, value, error):
+    logging.fatal(textwrap.dedent("""\
+                  There was a fatal error while deriving a representativ value for %(category)s.%(attribute)s.
+                  According to the API the type of this attribute is '%(type)s', but it was not possible to 
+                  derive this type from the received data:
+ 
+                  %(data)s
+
+                  Either we do something ugly wrong or a mapping for this attribute is needed.
+                  For more information consult the mitigation chapter in the documentation.""" 
+                  % { 'category': category.const, 'attribute': key, 'data': repr(value),'type': repr(category.field_type[key])}))
+
+
 class CMDBCategoryValuesList(collections.abc.MutableSequence):
     """
     A model of a multi value category of an object.
     """
 
+    __slots__ = ('category', 'items', 'deleted_items')
+
     def __init__(self, category):
         self.category = category
         self.items = list()
@@ -198,7 +378,7 @@ class CMDBCategoryValuesList(collections.abc.MutableSequence):
             del self.items[index]
         else:
             if self._is_item_saved(self.items[index]):
-                logging.debug("Add %s[%s] to deleted items" % (self.category.const,items[index].id))
+                logging.debug("Add %s[%s] to deleted items" % (self.category.const,self.items[index].id))
                 self.deleted_items.append(self.items[index])
             del self.items[index]
 
@@ -222,6 +402,11 @@ class CMDBCategoryValuesList(collections.abc.MutableSequence):
         else:
             raise TypeError("CMDBCategoryValuesList works only with dict or CMDBCategoryValues, but not with %s" % type(value))
 
+    def _append_decoded(self, row_id, data):
+        cat_value = CMDBCategoryValues(self.category)
+        cat_value._fill_decoded_data(row_id, data)
+        self.items.append(cat_value)
+
     def getChangeSet(self):
         """
         Generates a changeset for this category values list object.
@@ -257,90 +442,112 @@ class CMDBCategoryValuesList(collections.abc.MutableSequence):
         return False
 
 
+# Marks fields without a value in CMDBCategoryValues
+_UNSET = object()
+
 class CMDBCategoryValues(collections.abc.MutableMapping):
     """
     A model of category data of an object.
+
+    The values are kept in a list in the order of the field ordinals of the category,
+    see `CMDBCategory.field_index`, which is allocated when the first value is set.
+    The change state of the fields is kept as bits of an integer.
     """
 
+    __slots__ = ('id', 'category', '_values', '_changed')
+
     def __init__(self, category):
         self.id = None
         self.category = category
-        self.field_type = category.getFieldTypes()
-        self.field_data = dict()
+        self._values = None
         """
         Store the update/change state for each field in the values set of a category.
-        The value for a field is True when an update/change to that field had been applied
+        The bit of a field ordinal is set when an update/change to that field had been applied
         and a write to the database is required.
         """
-        self._change_state = dict()
-        self.markUnchanged()
+        self._changed = 0
+
+    @property
+    def field_type(self):
+        return self.category.field_type
+
+    @property
+    def field_data(self):
+        """
+        The values of the fields which have a value, as read-only mapping.
+        A snapshot, set values through the category values themselves.
+        """
+        return types.MappingProxyType(dict(self.items()))
 
     def _fill_category_data(self, fields):
-        loading = False
         if "id" in fields:
             # Guess that if an id is provided this is an database loading process
-            loading = True
-            self.id = fields['id']
-        for key in self.category.getFields():
-            try:
-                if key in fields:
-                    if loading:
-                        self.field_data[key] = value_representation_factory(self.category, key, fields[key])
-                    else:
-                        # In the none loading case the whole checking and processing of
-                        # user provided values is applied
-                        self[key] = fields[key]
-            except CMDBConversionException as e:
-                logging.fatal(textwrap.dedent("""\
-                              There was a fatal error while deriving a representativ value for %(category)s.%(attribute)s.
-                              According to the API the type of this attribute is '%(type)s', but it was not possible to 
-                              derive this type from the received data:
- 
-                              %(data)s
-
-                              Either we do something ugly wrong or a mapping for this attribute is needed.
-                              For more information consult the mitigation chapter in the documentation.""" 
-                              % { 'category': self.category.const, 'attribute': key, 'data': repr(fields[key]),'type': repr(self.field_type[key])}))
-                raise e
+            self._fill_decoded_data(fields['id'], self.category.decoder.decode(fields))
+            return
 
-        # When callend in a loading process, remark all fields to be unchanged 
-        if loading:
-            self.markUnchanged()
+        # In the none loading case the whole checking and processing of
+        # user provided values is applied
+        for key in self.category.getFields():
+            if key in fields:
+                try:
+                    self[key] = fields[key]
+                except CMDBConversionException as e:
+                    _log_conversion_error(self.category, key, fields[key], e)
+                    raise e
+
+    def _fill_decoded_data(self, row_id, data):
+        """
+        Fill the values of a loaded row, already converted by the decoder of the category,
+        and remark all fields to be unchanged.
+        """
+        self.id = row_id
+        if len(data) > 0:
+            values = self._values
+            if values is None:
+                values = self._values = [ _UNSET ] * len(self.category.field_names)
+            field_index = self.category.field_index
+            for key, value in data.items():
+                values[field_index[key]] = value
+        self._changed = 0
 
     def __setitem__(self, index, value):
-        if self.category.hasField(index):
+        ordinal = self.category.field_index.get(index)
+        if ordinal is not None:
             try:
               self.field_type[index].check(value)
             except Exception as e:
                 logging.error("Type check of index %s has failed" % index)
                 raise e
-            if index in self.field_data:
-               old_value = self.field_data[index]
-            else:
-               old_value = None
+            old_value = self[index]
             if old_value != value:
-                self.markFieldChanged(index)
-                self.field_data[index] = value
+                if self._values is None:
+                    self._values = [ _UNSET ] * len(self.category.field_names)
+                self._changed |= 1 << ordinal
+                self._values[ordinal] = value
         else:
             raise KeyError("Category " + self.category.const + " has no field " + index)
 
     def __getitem__(self, index):
-        try:
-            return self.field_data[index]
-        except KeyError as e:
-            if self.category.hasField(index):
-                return None
-            else:
-                raise e
+        ordinal = self.category.field_index.get(index)
+        if ordinal is None:
+            raise KeyError(index)
+        if self._values is None:
+            return None
+        value = self._values[ordinal]
+        return None if value is _UNSET else value
     
     def __delitem__(self, index):
         raise NotImplementedError()
 
     def __len__(self):
-        return len(self.field_data)
+        if self._values is None:
+            return 0
+        return len(self._values) - self._values.count(_UNSET)
 
     def __iter__(self):
-        return iter(self.field_data)
+        if self._values is None:
+            return iter(())
+        return ( key for key, value in zip(self.category.field_names, self._values) if value is not _UNSET )
 
     def getChangeSet(self):
         """
@@ -351,33 +558,27 @@ class CMDBCategoryValues(collections.abc.MutableMapping):
         return ("cmdb.category.save",self.id,parameter_data)
 
     def markFieldChanged(self,key):
-        self._change_state[key] = True
+        self._changed |= 1 << self.category.field_index[key]
 
     def markFieldUnchanged(self,key):
-        self._change_state[key] = False
+        self._changed &= ~(1 << self.category.field_index[key])
 
     def hasFieldChanged(self, key):
-        return self._change_state[key]
+        return (self._changed >> self.category.field_index[key]) & 1 == 1
 
     def markChanged(self):
         """
         Marks all fields of this CategoryValue to be changed.
         Hence a save operation would save them all.
         """
-        for field in self.category.getFields():
-            self.markFieldChanged(field)
+        self._changed = (1 << len(self.category.field_names)) - 1
             
     def markUnchanged(self):
         """
         Marks all fields of this CategoryValue to be unchanged.
         Hence a save operation wouldn't save any.
         """
-        for field in self.category.getFields():
-            self.markFieldUnchanged(field)
+        self._changed = 0
 
     def hasChanged(self):
-        for field in self.category.getFields():
-            if self.hasFieldChanged(field):
-                return True
-        return False
-
+        return self._changed != 0
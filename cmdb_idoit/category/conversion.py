@@ -17,6 +17,7 @@
 
 import datetime
 import logging
+import re
 
 from cmdb_idoit.exceptions import CMDBConversionException
 
@@ -135,3 +136,120 @@ def conver_gps(value):
         return {'latitude': latitude, 'longitude': longitude }
     else:
         raise CMDBConversionException("Value is not of type dict, but instead of type %s '%s'" % (type(value),repr(value)))
+
+
+# Column conversion
+#
+# The categories of many objects are converted a whole column of values at a time.
+# Dates and dialog ids repeat heavily, each distinct string is converted only once.
+# The format of dates is detected once for a column, values in other formats take
+# the way of the scalar conversion functions.
+
+def _memoized_column(func, values):
+    memo = dict()
+    result = list()
+    for value in values:
+        if type(value) is str:
+            if value not in memo:
+                memo[value] = func(value)
+            result.append(memo[value])
+        else:
+            result.append(func(value))
+    return result
+
+def _date_from_match(value):
+    return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+# Formats tried by conver_datetime, as pattern, whether the whole string has to match and parser
+_DATETIME_FORMATS = [ (re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}'), False,
+                       lambda value: datetime.datetime.fromisoformat(value[0:19])),
+                      (re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2} - [0-9]{2}:[0-9]{2}'), True,
+                       lambda value: datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[13:15]), int(value[16:18]))),
+                      (re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2}'), True, _date_from_match) ]
+
+def _match_format(value, pattern, full):
+    return (pattern.fullmatch(value) if full else pattern.match(value)) is not None
+
+def _datetime_column(values):
+    memo = dict()
+    detected = None
+    result = list()
+    for value in values:
+        if type(value) is not str or len(value) == 0:
+            result.append(conver_datetime(value))
+            continue
+        if value not in memo:
+            if detected is None:
+                detected = next((f for f in _DATETIME_FORMATS if _match_format(value, f[0], f[1])), None)
+            converted = None
+            if detected is not None and _match_format(value, detected[0], detected[1]):
+                try:
+                    converted = detected[2](value)
+                except ValueError:
+                    pass
+            memo[value] = converted if converted is not None else conver_datetime(value)
+        result.append(memo[value])
+    return result
+
+_DATE_FORMAT = re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+def _date_column(values):
+    memo = dict()
+    result = list()
+    for value in values:
+        if type(value) is not str:
+            result.append(conver_date(value))
+            continue
+        if value not in memo:
+            converted = None
+            date = value.split(' ')[0]
+            if _DATE_FORMAT.fullmatch(date):
+                try:
+                    converted = _date_from_match(date)
+                except ValueError:
+                    pass
+            memo[value] = converted if converted is not None else conver_date(value)
+        result.append(memo[value])
+    return result
+
+_COLUMN_FUNCTIONS = { conver_datetime: _datetime_column,
+                      conver_date: _date_column }
+
+# Conversion functions with immutable results, which may be shared between values
+_MEMOIZABLE = [ conver_integer, conver_dialog, conver_float, conver_money ]
+
+def conver_column(func, values, is_list=False):
+    """
+    Convert a column of values with the conversion function `func` in one call,
+    with the same results as `[ func(value) for value in values ]`. For list fields
+    each value is a list, converted like `conver_list` does.
+
+    :param function func: scalar conversion function, e.g. `conver_datetime`
+    :param list values: raw values of one field
+    :param bool is_list: the values are lists
+    :rtype: list
+    """
+    if is_list:
+        flat = list()
+        lengths = list()
+        for value in values:
+            if value is None:
+                lengths.append(0)
+            elif isinstance(value,list):
+                flat.extend(value)
+                lengths.append(len(value))
+            else:
+                raise CMDBConversionException("Expected value of type list, but instead it has type %s '%s'" % (type(value),repr(value)))
+        converted = conver_column(func, flat)
+        result = list()
+        position = 0
+        for length in lengths:
+            result.append(converted[position:position + length])
+            position += length
+        return result
+
+    if func in _COLUMN_FUNCTIONS:
+        return _COLUMN_FUNCTIONS[func](values)
+    if func in _MEMOIZABLE:
+        return _memoized_column(func, values)
+    return [ func(value) for value in values ]
@@ -18,7 +18,7 @@
 from .conversion import *
 
 from cmdb_idoit.exceptions import CMDBMissingTypeInformation
-from cmdb_idoit.session import request
+from cmdb_idoit.session import get_client
 
 import pkg_resources
 import re
@@ -26,21 +26,38 @@ import jsonpath_ng
 import datetime
 import textwrap
 
-rules = None
+# Parsed rules by i-doit version
+_rules_by_version = dict()
 
-def _get_rules():
-    global rules
-    if rules != None:
-        return rules
+def _get_rules(client=None):
+    """
+    Return the type mapping rules matching the i-doit version of the instance behind `client`.
+    """
+    client = get_client(client)
+    if client.type_rules != None:
+        return client.type_rules
 
     # request i-doit version
-    result = request("idoit.version",{})
+    result = client.request("idoit.version",{})
     if 'version' not in result:
         raise Exception("Can't determine idoit version")
-    version = result['version'].split('.')
+    client.type_rules = _rules_for_version(result['version'])
+    return client.type_rules
+
+def _rules_for_version(idoit_version):
+    """
+    Return the type mapping rules for the version string reported by `idoit.version`.
+    """
+    version = idoit_version.split('.')
+    version = f"{version[0]}_{version[1]}"
+
+    if version not in _rules_by_version:
+        _rules_by_version[version] = _load_rules(version)
+    return _rules_by_version[version]
 
+def _load_rules(version):
     resource_package = __name__  # Could be any module/package name
-    resource_path = '/'.join(('map', f"{version[0]}_{version[1]}.map"))  # Do not use os.path.join(), see below
+    resource_path = '/'.join(('map', f"{version}.map"))  # Do not use os.path.join(), see below
 
     template = pkg_resources.resource_string(resource_package, resource_path)
     rules = dict()
@@ -50,18 +67,82 @@ def _get_rules():
             raise Exception("None conformal rule: %s" % line)
         if rule_raw[0] not in rules:
             rules[rule_raw[0]] = dict()
-        #jpath = jsonpath_ng.parse(rule_raw[3]) 
         rules[rule_raw[0]][rule_raw[1]] = { 
                 'type': rule_raw[2], 
                 'path': rule_raw[3],
-                'jpath': None
+                'getter': compile_path(rule_raw[3])
                 }
     return rules
 
+# Simple paths like $, $.id, $[*].id or $.ref.title, which are compiled to plain getters
+_SIMPLE_PATH = re.compile(r'^\$((?:\.[A-Za-z_][A-Za-z0-9_]*|\[\*\])*)$')
+_PATH_STEP = re.compile(r'\.([A-Za-z_][A-Za-z0-9_]*)|\[\*\]')
+
+def _field_step(name):
+    def step(values):
+        return [ value[name] for value in values if isinstance(value, dict) and name in value ]
+    return step
+
+def _slice_step(values):
+    result = list()
+    for value in values:
+        if isinstance(value, list):
+            result.extend(value)
+        elif value is not None:
+            result.append(value)
+    return result
+
+def compile_path(path):
+    """
+    Compile a JSON path of a type mapping rule into a function, which returns the list
+    of matching values. Simple paths made of fields and `[*]` are evaluated natively,
+    with the same results as `jsonpath_ng`. Other paths are handed to `jsonpath_ng`.
+
+    :param str path: JSON path of the rule
+    :rtype: function
+    """
+    match = _SIMPLE_PATH.match(path)
+    if match is None:
+        expression = None
+        def getter(value):
+            nonlocal expression
+            if expression is None:
+                expression = jsonpath_ng.parse(path)
+            return [ datum.value for datum in expression.find(value) ]
+        return getter
+
+    steps = [ (name, name is None) for name in
+              (m.group(1) for m in _PATH_STEP.finditer(match.group(1))) ]
+
+    # The paths of nearly all rules
+    if steps == []:
+        return lambda value: [ value ]
+    if len(steps) == 1 and not steps[0][1]:
+        name = steps[0][0]
+        return lambda value: [ value[name] ] if isinstance(value, dict) and name in value else []
+    if len(steps) == 2 and steps[0][1] and not steps[1][1]:
+        name = steps[1][0]
+        def getter(value):
+            if isinstance(value, list):
+                return [ item[name] for item in value if isinstance(item, dict) and name in item ]
+            if isinstance(value, dict) and name in value:
+                return [ value[name] ]
+            return []
+        return getter
+
+    functions = [ _slice_step if is_slice else _field_step(name) for name, is_slice in steps ]
+    def getter(value):
+        values = [ value ]
+        for function in functions:
+            values = function(values)
+        return values
+    return getter
+
 def _apply_rule(rule,value):
-    if rule['jpath'] is None:
-        rule['jpath'] = jsonpath_ng.parse(rule['path']) 
-    return rule['jpath'].find(value)
+    """
+    Return the list of values matched by the JSON path of `rule`.
+    """
+    return rule['getter'](value)
 
 class AttributeType:
 
@@ -105,7 +186,7 @@ class AttributeType:
             return self.primary.__name__
 
 
-def get_type_mapping(category_const,field_name):
+def get_type_mapping(category_const,field_name,client=None):
     """
     Get the type mapping for given category and field.
     
@@ -114,7 +195,7 @@ def get_type_mapping(category_const,field_name):
 
     :rtype: str or None
     """
-    rules = _get_rules()
+    rules = _get_rules(client)
     if category_const in rules:
         if field_name in rules[category_const]:
             return rules[category_const][field_name]['path']
@@ -123,7 +204,7 @@ def get_type_mapping(category_const,field_name):
 
 def type_determination(category,key):
 
-    rules = _get_rules()
+    rules = _get_rules(category.client)
     category_const = category.get_const()
     # Do we have an overwrite for this category,key combination
     if category_const in rules:
@@ -203,8 +284,8 @@ def value_representation_factory(category,key,value = None):
         elif len(value) == 1 and isinstance(value[0],list) and len(value[0]) == 0:
             value = None
     if attr_type.hasRule() and value is not None:
-            matches = _apply_rule(attr_type.rule,value)
-            if len(matches) == 0:
+            match_values = _apply_rule(attr_type.rule,value)
+            if len(match_values) == 0:
                 field_object = category.getFieldObject(key)
                 if not 'type' in field_object['data']:
                     data_type = "<not defined>"
@@ -221,8 +302,7 @@ def value_representation_factory(category,key,value = None):
                         Either the api result has been changed and hence the mapping didn't work any more,
                         or we do something utterly wrong.
                         """))
-                raise Exception("Error matching value,",rules[category_const][key]['path'],str(value))
-            match_values = [match.value for match in matches]
+                raise Exception("Error matching value,",attr_type.rule['path'],str(value))
             if attr_type.isList():
                 return attr_type(match_values)
             elif len(match_values) == 1:
@@ -0,0 +1,106 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datetime import date, datetime
+import json
+
+from .exceptions import CMDBRequestError
+
+
+def json_serial(obj):
+    """JSON serializer for objects not serializable by default json code"""
+
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif isinstance(obj, CMDBRequestError):
+        return obj.message
+    raise TypeError ("Type %s not serializable" % type(obj))
+
+
+class JSONCodec:
+    """
+    Interface of the JSON codecs used to encode requests and decode responses.
+
+    :cvar str name: name of the codec
+    """
+    name = None
+
+    def encode(self, obj):
+        """
+        Serialize `obj` to UTF-8 encoded JSON.
+
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+    def decode(self, data):
+        """
+        Deserialize JSON given as :py:class:`bytes` or :py:class:`str`.
+        """
+        raise NotImplementedError()
+
+
+class StdlibCodec(JSONCodec):
+    """
+    Codec based on the :py:mod:`json` module of the standard library.
+    """
+    name = 'json'
+
+    def encode(self, obj):
+        return json.dumps(obj, default=json_serial).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on `orjson <https://github.com/ijl/orjson>`_.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.options = orjson.OPT_NON_STR_KEYS
+
+    def encode(self, obj):
+        return self.orjson.dumps(obj, default=json_serial, option=self.options)
+
+    def decode(self, data):
+        return self.orjson.loads(data)
+
+
+_codecs = { 'json': StdlibCodec,
+            'orjson': OrjsonCodec
+          }
+
+
+def get_codec(name=None):
+    """
+    Return an instance of the codec named `name`. Without a name the fastest
+    installed codec is returned, falling back to the standard library.
+
+    :param str name: 'json' or 'orjson'
+    :rtype: JSONCodec
+    """
+    if name is not None:
+        return _codecs[name]()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return StdlibCodec()
@@ -17,30 +17,115 @@
 
 from .session import *
 
+# Field info types whose values are kept in a dialog
+DIALOG_INFO_TYPES = ['dialog', 'dialog_plus', 'dialog_list', 'multiselect']
 
-def get_cmdb_dialog(category_const, field_name):
-    return CMDBDialog(category_const, field_name)
 
+class CMDBDialogCache(dict):
+    """
+    A special `dict` for caching `CMDBDialog`'s by `(category_const, field_name)`.
+    """
+
+    def __setitem__(self, key, value):
+        if not type(value) is CMDBDialog:
+            raise TypeError("Object is not of type CMDBDialog")
+        dict.__setitem__(self, key, value)
 
-def get_cmdb_dialog_id_from_const(category_const, field_name, dialog_const):
-    dialog_set = get_cmdb_dialog(category_const, field_name)
-    return dialog_set.get_cmdb_dialog_id_from_const(dialog_const)
+
+def get_cmdb_dialog(category_const, field_name, client=None):
+    """
+    Returns the cached `CMDBDialog` of a field, loading it on first use.
+    """
+    client = get_client(client)
+    key = (category_const, field_name)
+    if key not in client.dialog_cache:
+        client.dialog_cache[key] = CMDBDialog(category_const, field_name, client)
+    return client.dialog_cache[key]
+
+
+def get_cmdb_dialog_id_from_const(category_const, field_name, dialog_const, client=None):
+    dialog_set = get_cmdb_dialog(category_const, field_name, client)
+    entry = dialog_set.get_dialog_from_const(dialog_const)
+    if entry is None:
+        return None
+    return entry['id']
+
+
+def preload_dialogs(categories=None, object_type=None, client=None):
+    """
+    Load the dialogs of all dialog fields of the given categories, or of all categories
+    of an object type, in one bulk request and put them into the dialog cache.
+    Dialogs which are already cached are skipped.
+
+    :param list categories: category constants
+    :param object_type: id or constant of an object type
+    :param CMDBClient client: Client to use, defaults to the `default_client`.
+    :return: the dialogs of the categories by `(category_const, field_name)`
+    :rtype: dict
+    """
+    from .category import get_category
+    from .type import get_cmdb_type
+    from .exceptions import CMDBNoneAPICategory
+
+    client = get_client(client)
+    category_consts = list(categories or [])
+    if object_type is not None:
+        category_consts += get_cmdb_type(object_type, client).getCategories()
+
+    keys = list()
+    for category_const in category_consts:
+        try:
+            category = get_category(category_const, client=client)
+        except CMDBNoneAPICategory:
+            continue
+        if category is None:
+            continue
+        for field_name in category.getFields():
+            info = category.getFieldObject(field_name).get('info', {})
+            if info.get('type') in DIALOG_INFO_TYPES:
+                keys.append((category_const, field_name))
+
+    parameters = dict()
+    for i, (category_const, field_name) in enumerate(keys):
+        if (category_const, field_name) not in client.dialog_cache:
+            parameters[i] = {'method': 'cmdb.dialog.read', 'parameter': {'category': category_const, 'property': field_name}}
+    if len(parameters) > 0:
+        results = client.multi_method_request(parameters, store_errors=True)
+        for i, result in results.items():
+            if isinstance(result, list) and len(result) > 0:
+                category_const, field_name = keys[i]
+                client.dialog_cache[(category_const, field_name)] = CMDBDialog(category_const, field_name, client, result)
+            else:
+                logging.debug("Can't fetch dialog entries for category %s and field %s" % keys[i])
+
+    return { key: client.dialog_cache[key] for key in keys if key in client.dialog_cache }
 
 
 class CMDBDialog:
     """
-      Representation of a dialog value set.
+      Representation of a dialog value set, indexed by id, constant and title.
     """
 
-    def __init__(self, category_const, field_name):
+    def __init__(self, category_const, field_name, client=None, result=None):
+        """
+        :param str category_const: category constant
+        :param str field_name: name of the dialog field
+        :param CMDBClient client: Client to use, defaults to the `default_client`.
+        :param list result: Already fetched result of the `cmdb.dialog.read` request.
+        """
+        self.client = get_client(client)
         self.category = category_const
         self.field = field_name
         self.dialog_values = list()
-        self._load()
+        self._by_id = dict()
+        self._by_const = dict()
+        self._by_title = dict()
+        self._load(result)
 
-    def _load(self):
+    def _load(self, result=None):
 
-        result = request('cmdb.dialog.read', {'category': self.category, 'property': self.field})
+        if result is None:
+            result = self.client.request('cmdb.dialog.read', {'category': self.category, 'property': self.field})
 
         if len(result) == 0:
             logging.warning("Can't fetch dialog entries for category %s and field %s" % (self.category, self.field))
@@ -49,38 +134,62 @@ class CMDBDialog:
         else:
             for entry in result:
                 entry['id'] = int(entry['id'])
-                self.dialog_values.append(entry)
+                self._append(entry)
+
+    def _append(self, entry):
+        self.dialog_values.append(entry)
+        self._by_id.setdefault(entry['id'], entry)
+        if entry.get('const'):
+            self._by_const.setdefault(entry['const'], entry)
+        self._by_title.setdefault(entry['title'], entry)
 
     def get_field_name(self):
-        return self.field_name
+        return self.field
 
     def get_category(self):
-        return self.category_const
+        return self.category
 
     def get_dialog_from_const(self, dialog_const):
-        for entry in self.dialog_values:
-            if entry['const'] == dialog_const:
-                return entry
+        return self._by_const.get(dialog_const)
 
     def get_dialog_from_id(self, dialog_id):
-        for entry in self.dialog_values:
-            if entry['id'] == dialog_id:
-                return entry
+        return self._by_id.get(dialog_id)
 
     def get_id_for_value(self, value):
-        for entry in self.dialog_values:
-            if entry['title'] == value:
-                return entry['id']
-        return None
-
+        entry = self._by_title.get(value)
+        if entry is None:
+            return None
+        return entry['id']
 
     def values(self):
         return self.dialog_values
 
     def add(self, value):
-        if value not in [ x['title'] for x in self.dialog_values]:
-            result = request('cmdb.dialog.create', {'category': self.category, 'property': self.field, 'value': value})
+        """
+        Create the dialog value `value` unless it exists. Returns its id.
+        """
+        if value not in self._by_title:
+            result = self.client.request('cmdb.dialog.create', {'category': self.category, 'property': self.field, 'value': value})
             if 'entry_id' in result:
-                self.dialog_values.append({ 'const': '', 'id': int(result['entry_id']), 'title': value})
-
-        
+                self._append({ 'const': '', 'id': int(result['entry_id']), 'title': value})
+        return self.get_id_for_value(value)
+
+    def add_many(self, values):
+        """
+        Create all missing dialog values of `values` in one bulk request.
+        Returns the ids of the values in the given order.
+        """
+        missing = list()
+        seen = set()
+        for value in values:
+            if value not in self._by_title and value not in seen:
+                seen.add(value)
+                missing.append(value)
+        if len(missing) > 0:
+            parameters = { i: {'category': self.category, 'property': self.field, 'value': value} for i, value in enumerate(missing) }
+            results = self.client.multi_requests('cmdb.dialog.create', parameters)
+            for i, value in enumerate(missing):
+                result = results.get(i)
+                if isinstance(result, dict) and 'entry_id' in result:
+                    self._append({ 'const': '', 'id': int(result['entry_id']), 'title': value})
+        return [ self.get_id_for_value(value) for value in values ]
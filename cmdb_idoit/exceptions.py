@@ -31,3 +31,22 @@ class CMDBMissingTypeInformation(Exception):
 
 class CMDBUnkownType(Exception):
     pass
+
+class CMDBHTTPError(Exception):
+    """
+    The HTTP response of a request could not be processed as a whole.
+    """
+    def __init__(self,message,status_code,body=None):
+        super().__init__(message,body)
+        self.message = message
+        self.status_code = status_code
+        self.body = body
+
+class CMDBSessionExpired(Exception):
+    """
+    The i-doit instance rejected the session id of a request.
+    """
+    def __init__(self,message,session_id=None):
+        super().__init__(message)
+        self.message = message
+        self.session_id = session_id
@@ -0,0 +1,163 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from .session import *
+from .category import get_category, is_categorie_cached
+from .type import preload_types
+
+import array
+import collections.abc
+
+# Number of rows decoded at once, the raw rows of a block are released after decoding
+FRAME_BLOCK_ROWS = 5000
+
+
+def load_category_frame(objects_or_filter, category_const, fields=None, client=None):
+    """
+    Load the data of one category of many objects as columns, without building
+    :py:class:`cmdb_idoit.CMDBObject` and :py:class:`cmdb_idoit.CMDBCategoryValues`
+    for every row. Meant for reports and analytics, the data can't be changed and saved.
+
+    ::
+
+        frame = cmdb.load_category_frame({'type': 'C__OBJTYPE__SERVER'}, 'C__CATG__MEMORY', ['capacity'])
+        total = sum(frame['capacity'])
+
+    :param objects_or_filter: :py:class:`cmdb_idoit.CMDBObjects`, a list of objects or object ids,
+                              or a filter of `cmdb.objects`
+    :param str category_const: category constant
+    :param list fields: fields to load, by default all fields of the category
+    :param CMDBClient client: Client to use, defaults to the `default_client`.
+    :rtype: CMDBCategoryFrame
+    """
+    client = get_client(client)
+    if not is_categorie_cached(category_const, client):
+        # The kind and id of the category are given by the types
+        preload_types(client=client)
+    category = get_category(category_const, client=client)
+    if category is None:
+        raise Exception("Unknown category %s" % category_const)
+    if fields is None:
+        fields = list(category.getFields())
+    for field in fields:
+        if not category.hasField(field):
+            raise KeyError("Category " + category_const + " has no field " + field)
+
+    if objects_or_filter is None or isinstance(objects_or_filter, collections.abc.Mapping):
+        parameter = {'filter': dict() if objects_or_filter is None else objects_or_filter}
+        object_ids = [ int(raw_object['id']) for raw_object in client.request('cmdb.objects', parameter) ]
+    else:
+        object_ids = [ int(getattr(obj, 'id', obj)) for obj in objects_or_filter ]
+
+    frame = CMDBCategoryFrame(category, fields)
+    parameters = { object_id: {'objID': object_id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'}
+                   for object_id in object_ids }
+    rows = list()
+    row_objects = list()
+    for object_id, result in client.iter_multi_requests('cmdb.category.read', parameters):
+        for row in result:
+            rows.append(row)
+            row_objects.append(object_id)
+        if len(rows) >= FRAME_BLOCK_ROWS:
+            frame._extend(row_objects, rows)
+            rows = list()
+            row_objects = list()
+    frame._extend(row_objects, rows)
+    return frame
+
+
+class CMDBCategoryFrame(collections.abc.Mapping):
+    """
+    The data of one category of many objects as columns, a mapping from field name to column.
+
+    Columns of integer fields are an `array.array` of type 'q', as long as no value is empty,
+    otherwise a list. Columns of float fields are an `array.array` of type 'd', empty values
+    are NaN. All other columns are lists.
+
+    :ivar CMDBCategory category: the category
+    :ivar list fields: the loaded fields
+    :ivar array.array object_id: the object id of each row
+    :ivar array.array entry_id: the id of each row, the entry of a multi value category
+    """
+
+    def __init__(self, category, fields):
+        self.category = category
+        self.fields = list(fields)
+        self.object_id = array.array('q')
+        self.entry_id = array.array('q')
+        self.columns = dict()
+        for field in self.fields:
+            attr_type = category.getFieldType(field)
+            if attr_type.isList() or attr_type.getPrimaryType() not in (int, float):
+                self.columns[field] = list()
+            elif attr_type.getPrimaryType() is int:
+                self.columns[field] = array.array('q')
+            else:
+                self.columns[field] = array.array('d')
+
+    def _extend(self, row_objects, rows):
+        # The frame holds entries only, rows with a missing or null id have no entry_id and are
+        # dropped. Unlike CMDBObject._fill_category_data, which keeps them as values.
+        keep = [ i for i, row in enumerate(rows) if row.get('id') is not None ]
+        if len(keep) < len(rows):
+            row_objects = [ row_objects[i] for i in keep ]
+            rows = [ rows[i] for i in keep ]
+        if len(rows) == 0:
+            return
+        self.object_id.extend(row_objects)
+        self.entry_id.extend([ int(row['id']) for row in rows ])
+        columns = self.category.decoder.decode_columns(rows, self.fields)
+        for field in self.fields:
+            column = self.columns[field]
+            values = columns[field]
+            if type(column) is list:
+                column.extend(values)
+            elif column.typecode == 'd':
+                column.extend([ float('nan') if value is None else value for value in values ])
+            else:
+                try:
+                    column.extend(array.array('q', values))
+                except (TypeError, OverflowError):
+                    # Empty or huge values, fall back to a list
+                    self.columns[field] = column.tolist() + values
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    @property
+    def rows(self):
+        """
+        Number of rows.
+        """
+        return len(self.entry_id)
+
+    def to_dict(self):
+        """
+        Return all columns including `object_id` and `entry_id` as dict of lists,
+        e.g. for `pandas.DataFrame`.
+        """
+        data = { 'object_id': self.object_id.tolist(), 'entry_id': self.entry_id.tolist() }
+        for field in self.fields:
+            column = self.columns[field]
+            data[field] = column if type(column) is list else column.tolist()
+        return data
@@ -0,0 +1,195 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from .codec import get_codec
+from .sessionstore import cache_dir
+
+# Version of the snapshot file format, snapshots of other formats are ignored
+FORMAT = 1
+
+
+def schema_fingerprint(version, object_types):
+    """
+    Return a fingerprint of the i-doit version and the list of object types,
+    which is compared to detect a changed schema.
+
+    :param str version: version reported by `idoit.version`
+    :param list object_types: result of `cmdb.object_types`
+    """
+    types = sorted((t['id'], t['const'], t['title'], t['status']) for t in object_types)
+    return hashlib.sha1(json.dumps([version, types]).encode('utf-8')).hexdigest()
+
+
+class MetadataSnapshot:
+    """
+    Type, category and none API category metadata of one i-doit instance, as
+    returned by `cmdb.object_types`, `cmdb.object_type_categories` and `cmdb.category_info`.
+
+    :ivar str url: url of the instance
+    :ivar str version: i-doit version of the instance, which selects the type mapping rules
+    :ivar str fingerprint: fingerprint of the schema, see :py:func:`schema_fingerprint`
+    :ivar float created: time of creation
+    """
+
+    def __init__(self, url, version, fingerprint=None, created=None):
+        self.url = url
+        self.version = version
+        self.fingerprint = fingerprint
+        self.created = time.time() if created is None else created
+        self.types = dict()
+        self.type_consts = dict()
+        self.categories = dict()
+        self.none_api = set()
+        self.dirty = False
+
+    @staticmethod
+    def _category_key(kind, ident, const):
+        if kind == 'custom' or ident is None:
+            return 'c:%s' % const
+        return '%s:%s' % (kind[0], ident)
+
+    def get_type(self, ident):
+        """
+        Return the `(type, categories)` results of the type `ident`, an id or constant, or None.
+        """
+        key = self.type_consts.get(ident, str(ident))
+        entry = self.types.get(key)
+        if entry is None:
+            return None
+        return entry['type'], entry['categories']
+
+    def set_type(self, type_result, categories_result):
+        key = str(type_result['id'])
+        self.types[key] = {'type': type_result, 'categories': categories_result}
+        self.type_consts[type_result['const']] = key
+        self.dirty = True
+
+    def get_category(self, kind, ident, const):
+        """
+        Return the `cmdb.category_info` result of a category or None.
+
+        :param str kind: 'global', 'specific' or 'custom'
+        """
+        return self.categories.get(self._category_key(kind, ident, const))
+
+    def set_category(self, kind, ident, const, info):
+        key = self._category_key(kind, ident, const)
+        if key not in self.categories:
+            self.categories[key] = info
+            self.dirty = True
+
+    def add_none_api_category(self, const):
+        if const not in self.none_api:
+            self.none_api.add(const)
+            self.dirty = True
+
+    def to_dict(self):
+        return { 'format': FORMAT,
+                 'url': self.url,
+                 'version': self.version,
+                 'fingerprint': self.fingerprint,
+                 'created': self.created,
+                 'types': self.types,
+                 'categories': self.categories,
+                 'none_api': sorted(self.none_api)
+               }
+
+    @classmethod
+    def from_dict(cls, data):
+        snapshot = cls(data['url'], data['version'], data['fingerprint'], data['created'])
+        for entry in data['types'].values():
+            snapshot.set_type(entry['type'], entry['categories'])
+        snapshot.categories = data['categories']
+        snapshot.none_api = set(data['none_api'])
+        snapshot.dirty = False
+        return snapshot
+
+
+class MetadataCache:
+    """
+    Keeps :py:class:`MetadataSnapshot` on disk, one file for each i-doit instance.
+
+    :param str path: directory of the snapshots, default is ``metadata`` in :py:func:`cmdb_idoit.sessionstore.cache_dir`
+    :param float max_age: seconds after which a snapshot is discarded, None to keep it until
+                          the schema fingerprint changes
+    """
+
+    def __init__(self, path=None, max_age=86400):
+        if path is None:
+            path = os.path.join(cache_dir(), 'metadata')
+        self.path = path
+        self.max_age = max_age
+        self.codec = get_codec()
+
+    def _filename(self, url):
+        return os.path.join(self.path, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.json')
+
+    def load(self, url):
+        """
+        Return the snapshot of the instance at `url`, or None if there is none or it is outdated.
+        """
+        try:
+            with open(self._filename(url), 'rb') as f:
+                data = self.codec.decode(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logging.warning("Ignoring corrupt metadata cache for %s" % url)
+            return None
+        if data.get('format') != FORMAT or data.get('url') != url:
+            return None
+        if self.max_age is not None and time.time() - data['created'] > self.max_age:
+            logging.debug("Metadata cache for %s is outdated" % url)
+            return None
+        return MetadataSnapshot.from_dict(data)
+
+    def save(self, snapshot):
+        """
+        Write the `snapshot`, replacing the previous one of its instance.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.metadata-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.codec.encode(snapshot.to_dict()))
+            os.replace(tmp_path, self._filename(snapshot.url))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        snapshot.dirty = False
+
+    def clear(self, url=None):
+        """
+        Remove the snapshot of the instance at `url`, or all snapshots.
+        """
+        if url is not None:
+            filenames = [ self._filename(url) ]
+        else:
+            filenames = glob.glob(os.path.join(self.path, '*.json'))
+        for filename in filenames:
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
@@ -18,8 +18,19 @@
 from .session import *
 from .category import *
 from .type import *
+from .category.category import CMDBCategoryValuesList
+from . import aio
 
+import collections
 import collections.abc
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# Attributes of CMDBObject indexed by CMDBObjects
+INDEXED_ATTRIBUTES = ('id', 'title', 'sys_id')
+
+# Number of category reads of a chunk of CMDBObjects.loadAllCategoryData
+LOAD_CHUNK_CALLS = 16384
 
 
 class CMDBObjects(list):
@@ -28,27 +39,187 @@ class CMDBObjects(list):
     By default no filters are applied resulting this to be the list of all objects in the cmdb.
 
     :ivar dict filters: Given filter for this object list.
+
+    The lookups by id, title and sys_id use hash indexes, which are built on the first
+    lookup and are kept up to date when objects are added or removed and when these
+    attributes change. Other modifications of the list, like sorting or assigning
+    slices, drop the indexes and they are rebuilt on the next lookup.
+
+    Objects created by the list remember it. When a category of such an object is
+    accessed and not loaded yet, it is loaded for the objects of the list in the
+    `prefetch_window` with one batch of requests.
     """
 
-    def __init__(self, filters=None, limit=0):
+    #: Number of objects, starting at the accessed one, for which a category is loaded when
+    #: it is accessed on an object of this list for the first time, None for all objects.
+    prefetch_window = None
+
+    def __init__(self, filters=None, limit=0, result=None, client=None):
         """
         :param dict filters: Definition of the objects list filter.
         :param int limit: Number of objects which should be loaded.
+        :param list result: Already fetched result of the `cmdb.objects` request.
+        :param CMDBClient client: Client to use, defaults to the `default_client`.
         """
+        self.client = get_client(client)
+        self._attribute_indexes = None
+        self._field_indexes = dict()
+        # Positions of the objects by their identity, built by _position
+        self._positions = None
         if filters is None:
             self.filters = dict()
         else:
             self.filters = filters
 
-        parameter = {'filter': self.filters}
-        if limit != 0:
-            parameter['limit'] = limit
+        if result is None:
+            result = self.client.request('cmdb.objects', self._build_parameter(self.filters, limit))
+
+        # Load all types of the objects at once instead of one after another
+        type_ids = sorted(set( int(raw_object['type']) for raw_object in result ))
+        if any( type_id not in self.client.type_cache for type_id in type_ids ):
+            preload_types(type_ids, self.client)
 
-        result = request('cmdb.objects', parameter)
+        # Objects load unloaded categories together with their siblings
+        siblings = weakref.ref(self)
         for raw_object in result:
-            cmdb_object = CMDBObject(raw_object)
+            cmdb_object = CMDBObject(raw_object, client=self.client)
+            cmdb_object._siblings = siblings
             self.append(cmdb_object)
 
+    @staticmethod
+    def _build_parameter(filters, limit=0):
+        parameter = {'filter': dict() if filters is None else filters}
+        if limit != 0:
+            parameter['limit'] = limit
+        return parameter
+
+    def _build_attribute_indexes(self):
+        indexes = { name: dict() for name in INDEXED_ATTRIBUTES }
+        for obj in self:
+            self._index_object(obj, indexes)
+        self._attribute_indexes = indexes
+        return indexes
+
+    def _index_object(self, obj, indexes):
+        for name in INDEXED_ATTRIBUTES:
+            indexes[name].setdefault(getattr(obj, name), list()).append(obj)
+        watchers = obj.__dict__.setdefault('_indexed_by', list())
+        if not any(watcher() is self for watcher in watchers):
+            watchers.append(weakref.ref(self))
+
+    def _add_to_indexes(self, objects):
+        if self._positions is not None:
+            start = len(self) - len(objects)
+            for offset, obj in enumerate(objects):
+                self._positions.setdefault(id(obj), start + offset)
+        if self._attribute_indexes is not None:
+            for obj in objects:
+                self._index_object(obj, self._attribute_indexes)
+        for (category_const, field), index in self._field_indexes.items():
+            for obj in objects:
+                self._index_field(obj, category_const, field, index)
+
+    def _remove_from_indexes(self, obj):
+        if self._attribute_indexes is not None:
+            for name in INDEXED_ATTRIBUTES:
+                _remove_from_bucket(self._attribute_indexes[name], getattr(obj, name), obj)
+        for (category_const, field), index in self._field_indexes.items():
+            for value in _field_values(obj, category_const, field):
+                _remove_from_bucket(index, value, obj)
+
+    def _drop_indexes(self):
+        self._attribute_indexes = None
+        self._field_indexes = dict()
+        self._positions = None
+
+    def _position(self, obj):
+        """
+        Return the position of the object itself in this list, None if it is not contained.
+        """
+        if self._positions is None:
+            positions = dict()
+            for position, entry in enumerate(self):
+                positions.setdefault(id(entry), position)
+            self._positions = positions
+        return self._positions.get(id(obj))
+
+    def _attribute_changed(self, obj, name, old_value, value):
+        """
+        Called by an indexed object when one of the `INDEXED_ATTRIBUTES` has changed.
+        """
+        if self._attribute_indexes is None:
+            return
+        index = self._attribute_indexes[name]
+        bucket = index.get(old_value, ())
+        if any(entry is obj for entry in bucket):
+            _remove_from_bucket(index, old_value, obj)
+            index.setdefault(value, list()).append(obj)
+
+    def _find_by_attribute(self, name, value):
+        indexes = self._attribute_indexes
+        if indexes is None:
+            indexes = self._build_attribute_indexes()
+        bucket = indexes[name].get(value)
+        return bucket[0] if bucket else None
+
+    def append(self, obj):
+        super().append(obj)
+        self._add_to_indexes([ obj ])
+
+    def extend(self, objects):
+        objects = list(objects)
+        super().extend(objects)
+        self._add_to_indexes(objects)
+
+    def __iadd__(self, objects):
+        self.extend(objects)
+        return self
+
+    def remove(self, obj):
+        # Comparing objects compares all their category data, look for the object itself first
+        for index, entry in enumerate(self):
+            if entry is obj:
+                break
+        else:
+            index = self.index(obj)
+        self.pop(index)
+
+    def pop(self, index=-1):
+        obj = super().pop(index)
+        self._remove_from_indexes(obj)
+        # The following objects moved
+        self._positions = None
+        return obj
+
+    def insert(self, index, obj):
+        super().insert(index, obj)
+        self._drop_indexes()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._drop_indexes()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._drop_indexes()
+
+    def __imul__(self, count):
+        result = super().__imul__(count)
+        self._drop_indexes()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._drop_indexes()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._drop_indexes()
+
+    def reverse(self):
+        super().reverse()
+        self._drop_indexes()
+
     def find_object_by_id(self, id):
         """
         Search and return an object by id.
@@ -56,38 +227,127 @@ class CMDBObjects(list):
         """
         if isinstance(id, str):
             id = int(id)
-        for obj in self:
-            if obj.id == id:
-                return obj
-        return None
+        return self._find_by_attribute('id', id)
 
     def find_object_by_title(self, title):
         """
         Search and return an object by title.
+        Return None if none is found. If several objects have this title, the first
+        indexed one is returned.
+        """
+        return self._find_by_attribute('title', title)
+
+    def find_object_by_sys_id(self, sys_id):
+        """
+        Search and return an object by sys_id.
         Return None if none is found.
         """
+        return self._find_by_attribute('sys_id', sys_id)
+
+    def build_index(self, category_const, field):
+        """
+        Build an index from the values of a category field to the objects, from the
+        already loaded category data. Objects whose category is not loaded are not indexed,
+        entries of multi value categories are indexed each. Values which are not hashable,
+        like lists, are skipped.
+
+        Once built, :py:meth:`find_object_by_field` uses the index. Objects added to this
+        list are indexed, but changes of category values are not followed, build the index
+        again after changing values.
+
+        :param str category_const: category constant
+        :param str field: field of the category
+        :return: dict from value to the list of objects
+        :rtype: dict
+        """
+        index = dict()
         for obj in self:
-            if obj.title == title:
-                return obj
-        return None
+            self._index_field(obj, category_const, field, index)
+        self._field_indexes[(category_const, field)] = index
+        return index
+
+    @staticmethod
+    def _index_field(obj, category_const, field, index):
+        for value in _field_values(obj, category_const, field):
+            bucket = index.setdefault(value, list())
+            if len(bucket) == 0 or bucket[-1] is not obj:
+                bucket.append(obj)
 
     def find_object_by_field(self, category_const, key, value):
         """
-        Find an object by category field. This function will not always work
-        for multi_value categories.
+        Find an object by category field. For multi value categories an object is
+        found if one of its entries has the value. Uses the index created by
+        :py:meth:`build_index`, otherwise the category data of all objects is searched
+        and loaded if required.
         """
+        index = self._field_indexes.get((category_const, key))
+        if index is not None and isinstance(value, collections.abc.Hashable):
+            bucket = index.get(value)
+            return bucket[0] if bucket else None
 
+        self.prefetch([ category_const ])
         for cmdb_object in self:
-            multi_value = get_cmdb_type(cmdb_object.type).get_category_inclusion(category_const).multi_value
-            if multi_value:
-                for entry in cmdb_object[category_const]:
+            if not cmdb_object.hasTypeCategory(category_const):
+                continue
+            values = cmdb_object[category_const]
+            if isinstance(values, CMDBCategoryValuesList):
+                for entry in values:
                     if entry[key] == value:
                         return cmdb_object
             else:
-                if cmdb_object[category_const][key] == value:
+                if values[key] == value:
                     return cmdb_object
         return None
 
+    def prefetch(self, category_consts):
+        """
+        Load the given categories of all objects which have them and have not loaded
+        them yet, with one batch of requests.
+
+        :param list category_consts: category constants
+        """
+        self._prefetch_objects(self, category_consts)
+
+    def _prefetch_siblings(self, obj, category_const):
+        """
+        Load a category for `obj` and the objects of this list following it within
+        the `prefetch_window`, which have not loaded it yet.
+        """
+        if self.prefetch_window is None:
+            objects = self
+        else:
+            position = self._position(obj)
+            if position is None:
+                return
+            objects = self[position:position + max(1, self.prefetch_window)]
+        self._prefetch_objects(objects, [ category_const ])
+
+    def _prefetch_objects(self, objects, category_consts):
+        pairs = [ (obj, category_const) for category_const in category_consts for obj in objects
+                  if obj.id is not None and obj.hasTypeCategory(category_const) and not obj._is_category_data_fetched(category_const) ]
+        if len(pairs) == 0:
+            return
+        self._fill_category_pairs(pairs, self._read_category_pairs(pairs))
+
+    def where(self, condition):
+        """
+        Return the objects matching a condition, see :py:class:`cmdb_idoit.CMDBCondition`.
+        The categories used by the condition are prefetched, then it is evaluated locally.
+
+        ::
+
+            servers = objects.where((cmdb.CMDBAttribute('type') == 'C__OBJTYPE__SERVER') &
+                                    (cmdb.CMDBField('C__CATG__MEMORY', 'capacity') >= 16))
+
+        :param CMDBCondition condition: the condition
+        :rtype: CMDBObjects
+        """
+        self.prefetch(sorted(condition.categories()))
+        matches = CMDBObjects(result=[], client=self.client)
+        matches.filters = self.filters
+        matches.extend(obj for obj in self if condition.matches(obj))
+        return matches
+
     def findObjectsByFunction(self, function):
         """
         Find all object for that `function` is true,
@@ -103,52 +363,276 @@ class CMDBObjects(list):
         """
         Fetch category data for all contained objects.
         """
+        parameters = self._category_read_parameters(category_const, reload)
+        result = self.client.multi_requests('cmdb.category.read', parameters)
+        self._fill_category_results(category_const, result)
+
+    async def loadCategoryDataAsync(self, category_const, reload=False):
+        """
+        Asynchronous variant of :py:meth:`loadCategoryData`.
+        """
+        parameters = self._category_read_parameters(category_const, reload)
+        result = await aio.multi_requests('cmdb.category.read', parameters, self.client)
+        self._fill_category_results(category_const, result)
+
+    def _category_read_parameters(self, category_const, reload):
         parameters = dict()
         for obj in self:
             # Check if the category data has already been fetched on the object
             # TODO Provide an method which encapsulates the internal data structure
             if obj.hasTypeCategory(category_const):
-                if not obj.field_data_fetched[category_const] or reload:
+                if not obj._is_category_data_fetched(category_const) or reload:
                     parameters[obj.id] = {'objID': obj.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'}
         if len(parameters) == 0:
             logging.warning("Loading category data '%s' on set result in no action" % category_const)
-        result = multi_requests('cmdb.category.read', parameters)
+        return parameters
 
-        for obj in self:
-            if obj.id in result:
-                obj._fill_category_data(category_const, result[obj.id])
+    def _fill_category_results(self, category_const, result):
+        self._fill_category_rows(category_const, [ (obj, result[obj.id]) for obj in self if obj.id in result ])
 
-    def loadAllCategoryData(self):
+    def _fill_category_rows(self, category_const, object_rows):
+        """
+        Fill the rows of one category into their objects, given as list of `(object, rows)`.
+        The rows of all objects are converted together, a column at a time.
+        """
+        if len(object_rows) == 0:
+            return
+        category_object = get_category(category_const, client=self.client)
+        decoded = category_object.decoder.decode_rows([ fields for obj, rows in object_rows for fields in rows if 'id' in fields ])
+        position = 0
+        for obj, rows in object_rows:
+            count = sum(1 for fields in rows if 'id' in fields)
+            obj._fill_category_data(category_const, rows, category_object, decoded[position:position + count])
+            position += count
+
+    def loadAllCategoryData(self, chunk_calls=LOAD_CHUNK_CALLS, progress=None):
         """
         Fetch data for all categories for all contained objects.
+
+        The categories are read in chunks of whole objects with about `chunk_calls` category
+        reads. While the results of a chunk are converted and filled into its objects, the
+        next chunk is requested, so at most two chunks of results are held at a time.
+
+        :param int chunk_calls: Number of category reads of a chunk.
+        :param progress: Called with the number of loaded objects and the number of all
+                         objects after each chunk.
         """
-        parameters = dict()
-        for obj in self:
-            categories = obj.getTypeCategories()
-            for category_const in categories:
-                parstr = "%s--%s" % (category_const, obj.id)
-                parameters["%s--%s" % (category_const, obj.id)] = {'objID': obj.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'}
-        result = multi_requests('cmdb.category.read', parameters)
+        total = sum(1 for obj in self if obj.id is not None)
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for chunk in self._all_category_chunks(chunk_calls):
+                # Request the chunk before filling the previous one
+                future = executor.submit(self._read_category_pairs, chunk)
+                if pending is not None:
+                    loaded += self._fill_loaded_chunk(*pending)
+                    if progress is not None:
+                        progress(loaded, total)
+                pending = (chunk, future)
+            if pending is not None:
+                loaded += self._fill_loaded_chunk(*pending)
+                if progress is not None:
+                    progress(loaded, total)
+
+    async def loadAllCategoryDataAsync(self):
+        """
+        Asynchronous variant of :py:meth:`loadAllCategoryData`.
+        """
+        pairs = [ pair for chunk in self._all_category_chunks(None) for pair in chunk ]
+        result = await aio.multi_requests('cmdb.category.read', self._category_pair_parameters(pairs), self.client)
+        self._fill_category_pairs(pairs, result)
 
+    def _all_category_chunks(self, chunk_calls):
+        """
+        Generate lists of `(object, category_const)` for all categories of the saved objects,
+        each covering whole objects with about `chunk_calls` pairs, or all in one if None.
+        """
+        chunk = list()
         for obj in self:
-            categories = obj.getTypeCategories()
-            for category_const in categories:
-                parstr = "%s--%s" % (category_const, obj.id)
-                if parstr in result:
-                    obj._fill_category_data(category_const, result[parstr])
+            if obj.id is None:
+                continue
+            chunk.extend((obj, category_const) for category_const in obj.getTypeCategories())
+            if chunk_calls is not None and len(chunk) >= chunk_calls:
+                yield chunk
+                chunk = list()
+        if len(chunk) > 0:
+            yield chunk
+
+    def _fill_loaded_chunk(self, chunk, future):
+        """
+        Fill the result of a chunk when it has arrived, return the number of its objects.
+        """
+        self._fill_category_pairs(chunk, future.result())
+        return len(set(id(obj) for obj, category_const in chunk))
 
+    @staticmethod
+    def _category_pair_parameters(pairs):
+        return { index: {'objID': obj.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'}
+                 for index, (obj, category_const) in enumerate(pairs) }
 
-def loadObject(ident):
+    def _read_category_pairs(self, pairs):
+        return self.client.multi_requests('cmdb.category.read', self._category_pair_parameters(pairs))
+
+    def _fill_category_pairs(self, pairs, result):
+        """
+        Fill the results of reading `pairs` of `(object, category_const)`, keyed by their index.
+        """
+        by_category = dict()
+        for index, (obj, category_const) in enumerate(pairs):
+            if index in result:
+                by_category.setdefault(category_const, list()).append((obj, result[index]))
+        for category_const, object_rows in by_category.items():
+            self._fill_category_rows(category_const, object_rows)
+
+
+def iter_objects(filters=None, page_size=1000, prefetch=1, client=None):
+    """
+    Iterate over the objects given by the filter, reading them page by page from
+    `cmdb.objects` in the order of their ids. Objects are yielded as soon as their page
+    has arrived and only the pages in flight are kept in memory.
+
+    ::
+
+        for obj in cmdb.iter_objects({'type': 'C__OBJTYPE__CLIENT'}, page_size=500):
+            process(obj)
+
+    :param dict filters: Definition of the objects filter, see :py:class:`CMDBObjects`.
+    :param int page_size: Number of objects read with each request.
+    :param int prefetch: Number of following pages requested concurrently while a page
+                         is processed, 0 to request them one after another.
+    :param CMDBClient client: Client to use, defaults to the `default_client`.
+    :rtype: iterator of :py:class:`CMDBObject`
+    """
+    client = get_client(client)
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1, but is %i" % page_size)
+
+    def read_page(offset):
+        parameter = CMDBObjects._build_parameter(filters)
+        parameter['limit'] = "%i,%i" % (offset, page_size)
+        parameter['order_by'] = 'id'
+        parameter['sort'] = 'ASC'
+        return client.request('cmdb.objects', parameter)
+
+    executor = ThreadPoolExecutor(max_workers=prefetch) if prefetch > 0 else None
+    pending = collections.deque()
+    offset = 0
+    try:
+        while True:
+            if executor is None:
+                page = read_page(offset)
+                offset += page_size
+            else:
+                while len(pending) <= prefetch:
+                    pending.append(executor.submit(read_page, offset))
+                    offset += page_size
+                page = pending.popleft().result()
+
+            yield from CMDBObjects(result=page, client=client)
+            if len(page) < page_size:
+                break
+    finally:
+        # Pages behind the end or not needed anymore
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def query_objects(condition, client=None):
+    """
+    Load the objects matching a condition, see :py:class:`cmdb_idoit.CMDBCondition`.
+    Equality conditions on the id, title, sys_id and type which all results have to
+    fulfill are passed as filter to `cmdb.objects`, the whole condition is evaluated
+    by :py:meth:`CMDBObjects.where`.
+
+    ::
+
+        objects = cmdb.query_objects((cmdb.CMDBAttribute('type') == 'C__OBJTYPE__SERVER') &
+                                     (cmdb.CMDBField('C__CATG__IP', 'hostname').contains('web')))
+
+    :param CMDBCondition condition: the condition
+    :param CMDBClient client: Client to use, defaults to the `default_client`.
+    :rtype: CMDBObjects
+    """
+    return CMDBObjects(condition.pushdown(), client=client).where(condition)
+
+
+def _field_values(obj, category_const, field):
+    """
+    Return the hashable values of a field of the loaded category data of `obj`.
+    """
+    if not obj.hasTypeCategory(category_const) or not obj._is_category_data_fetched(category_const):
+        return []
+    values = obj.fields[category_const]
+    entries = values if isinstance(values, CMDBCategoryValuesList) else [ values ]
+    return [ entry[field] for entry in entries if isinstance(entry[field], collections.abc.Hashable) ]
+
+
+def _remove_from_bucket(index, value, obj):
+    """
+    Remove `obj` from the list of objects of `value` in `index`, compared by identity.
+    """
+    bucket = index.get(value)
+    if bucket is None:
+        return
+    bucket[:] = [ entry for entry in bucket if entry is not obj ]
+    if len(bucket) == 0:
+        del index[value]
+
+
+def loadObject(ident, client=None):
     """
     Load object by ``ident``.
     """
-    objects = CMDBObjects({'ids': [ident]})
+    objects = CMDBObjects({'ids': [ident]}, client=client)
     if len(objects) == 0:
         return None
     else:
         return objects.pop()
 
 
+class _FetchState(collections.abc.MutableMapping):
+    """
+    Whether the categories of an object have been fetched, False for every category
+    of its type unless fetched. Only the fetched categories are stored.
+    """
+
+    __slots__ = ('_categories', '_fetched')
+
+    def __init__(self, categories):
+        self._categories = categories
+        # Created with the first fetched category
+        self._fetched = None
+
+    def __getitem__(self, category_const):
+        if category_const not in self._categories:
+            raise KeyError(category_const)
+        return self._fetched is not None and category_const in self._fetched
+
+    def __setitem__(self, category_const, fetched):
+        if category_const not in self._categories:
+            raise KeyError(category_const)
+        if fetched:
+            if self._fetched is None:
+                self._fetched = set()
+            self._fetched.add(category_const)
+        elif self._fetched is not None:
+            self._fetched.discard(category_const)
+
+    def __delitem__(self, category_const):
+        self[category_const] = False
+
+    def __iter__(self):
+        return iter(self._categories)
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class CMDBObject(collections.abc.Mapping):
     """
     An cmdb object. Is basically a dictionary of the categories which
@@ -161,7 +645,9 @@ class CMDBObject(collections.abc.Mapping):
     :var bool _change_state: Has this object been changed.
     """
 
-    def __init__(self, object_data, fetch_all=False):
+    def __init__(self, object_data, fetch_all=False, client=None):
+
+        self.client = get_client(client)
 
         # Attributes of an object
         self.id = None
@@ -170,9 +656,13 @@ class CMDBObject(collections.abc.Mapping):
         self.type = None
         self._change_state = False
 
-        # Fields contains the structure of the object rebuild with CMDBCategoryValues and CMDBCategoryValuesList Objects
+        # Fields contains the structure of the object rebuild with CMDBCategoryValues and CMDBCategoryValuesList Objects,
+        # which are created on first access
         self.fields = None
-        self.field_data_fetched = dict()
+        self.field_data_fetched = None
+
+        # Weak reference to the CMDBObjects which created this object
+        self._siblings = None
 
         # Handle object data
         if isinstance(object_data, collections.abc.Mapping):
@@ -187,7 +677,7 @@ class CMDBObject(collections.abc.Mapping):
         self._change_state = False
 
         # Fetch type information
-        self.type_object = get_cmdb_type(self.type)
+        self.type_object = get_cmdb_type(self.type, self.client)
         self.fields = self.type_object.getObjectStructure()
         self._reset_fetch_state()
 
@@ -195,8 +685,7 @@ class CMDBObject(collections.abc.Mapping):
             self.loadAllCategoryData()
 
     def _reset_fetch_state(self):
-        for category_const in self.getTypeCategories():
-            self.field_data_fetched[category_const] = False
+        self.field_data_fetched = _FetchState(self.fields)
 
     def loadAllCategoryData(self):
         """
@@ -207,11 +696,27 @@ class CMDBObject(collections.abc.Mapping):
         if self.id is None:
             return
 
+        result = self.client.multi_requests('cmdb.category.read', self._all_category_read_parameters())
+        self._fill_all_category_results(result)
+
+    async def loadAllCategoryDataAsync(self):
+        """
+        Asynchronous variant of :py:meth:`loadAllCategoryData`.
+        """
+        if self.id is None:
+            return
+
+        result = await aio.multi_requests('cmdb.category.read', self._all_category_read_parameters(), self.client)
+        self._fill_all_category_results(result)
+
+    def _all_category_read_parameters(self):
         categories = self.getTypeCategories()
         parameters = dict()
         for category_const in categories:
             parameters[category_const] = {'objID': self.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'}
-        result = multi_requests('cmdb.category.read', parameters)
+        return parameters
+
+    def _fill_all_category_results(self, result):
         for category_const in result:
             if len(result[category_const]) > 0:
                 self._fill_category_data(category_const, result[category_const])
@@ -233,29 +738,41 @@ class CMDBObject(collections.abc.Mapping):
 
         if category_const not in self.fields:
             raise Exception('Object has no category %s in his type %s' % (category_const, self.type_object.const))
-        category_object = get_category(category_const)
+        category_object = get_category(category_const, client=self.client)
 
         # Check if the category data has already been fetched
-        if self.field_data_fetched[category_const] and not reload:
+        if self._is_category_data_fetched(category_const) and not reload:
             return
 
-        result = request('cmdb.category.read', {'objID': self.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'})
+        result = self.client.request('cmdb.category.read', {'objID': self.id, 'category': category_const, 'status': 'C__RECORD_STATUS__NORMAL'})
         self._fill_category_data(category_const, result, category_object)
 
-    def _fill_category_data(self, category_const, result, category_object=None):
+    def _fill_category_data(self, category_const, result, category_object=None, decoded=None):
+        """
+        :param list decoded: the loaded rows of `result` already converted by the decoder of the category
+        """
         if category_const not in self.fields:
             raise Exception('Object has no category %s in his type %s' % (category_const, self.type_object.const))
         if not category_object:
-            category_object = get_category(category_const)
+            category_object = get_category(category_const, client=self.client)
 
-        multi_value = get_cmdb_type(self.type).get_category_inclusion(category_const).multi_value
+        multi_value = get_cmdb_type(self.type, self.client).get_category_inclusion(category_const).multi_value
 
-        if multi_value:
-            for fields in result:
-                self.fields[category_const].append(fields)
-        else:
-            for fields in result:
-                self.fields[category_const]._fill_category_data(fields)
+        if decoded is None:
+            decoded = category_object.decoder.decode_rows([ fields for fields in result if 'id' in fields ])
+        decoded = iter(decoded)
+
+        values = self.fields[category_const]
+        for fields in result:
+            if 'id' not in fields:
+                if multi_value:
+                    values.append(fields)
+                else:
+                    values._fill_category_data(fields)
+            elif multi_value:
+                values._append_decoded(fields['id'], next(decoded))
+            else:
+                values._fill_decoded_data(fields['id'], next(decoded))
 
         self.field_data_fetched[category_const] = True
 
@@ -275,15 +792,26 @@ class CMDBObject(collections.abc.Mapping):
         if name in [ 'id', 'sys_id','title','status','type']:
             if name not in self.__dict__ or self.__dict__[name] != value:
                 self.__dict__['_change_state'] = True
+                if name in INDEXED_ATTRIBUTES and '_indexed_by' in self.__dict__:
+                    self._notify_indexes(name, self.__dict__.get(name), value)
         self.__dict__[name] = value
 
+    def _notify_indexes(self, name, old_value, value):
+        for watcher in self.__dict__['_indexed_by']:
+            objects = watcher()
+            if objects is not None:
+                objects._attribute_changed(self, name, old_value, value)
+
     def __repr__(self):
         return repr({'id': self.id, 'type': self.type, 'title': self.title, 'values': self.fields})
 
     def __getitem__(self, key):
-        # TODO: Fetch categorie data only at access time
         if not self._is_category_data_fetched(key) and self.id is not None:
-            self.loadCategoryData(key)
+            siblings = self._siblings() if self._siblings is not None else None
+            if siblings is not None:
+                siblings._prefetch_siblings(self, key)
+            if not self._is_category_data_fetched(key):
+                self.loadCategoryData(key)
         return self.fields[key]
 
     def __delitem__(self, category_const):
@@ -309,7 +837,8 @@ class CMDBObject(collections.abc.Mapping):
     def hasChanged(self):
         if self._change_state:
             return True
-        for category_const,field in self.fields.items():
+        # Categories which have not been accessed are unchanged
+        for category_const,field in self.fields.materialized_items():
             if field.hasChanged():
                 return True
         return False
@@ -327,23 +856,47 @@ class CMDBObject(collections.abc.Mapping):
 
         # Check if object attributes has been changed
         if self._change_state:
-            parameter = dict()
-            if not is_create:
-                parameter['id'] = self.id
-            parameter['type'] = self.type
-            parameter['title'] = self.title
+            result = self.client.request(*self._object_save_request(is_create))
+            self._change_state = False
+
+        if is_create:
+            self.id = result['id']
+
+        self.client.multi_method_request(self._category_save_requests(is_create))
 
-            method = "cmdb.object.create" if is_create else "cmdb.object.update"
+    async def saveAsync(self):
+        """
+        Asynchronous variant of :py:meth:`save`.
+        """
+        is_create = self.id is None
 
-            result = request(method, parameter)
+        if self._change_state:
+            result = await aio.request(*self._object_save_request(is_create), client=self.client)
             self._change_state = False
 
         if is_create:
             self.id = result['id']
 
+        await aio.multi_method_request(self._category_save_requests(is_create), client=self.client)
+
+    def _object_save_request(self, is_create):
+        parameter = dict()
+        if not is_create:
+            parameter['id'] = self.id
+        parameter['type'] = self.type
+        parameter['title'] = self.title
+
+        method = "cmdb.object.create" if is_create else "cmdb.object.update"
+        return (method, parameter)
+
+    def _category_save_requests(self, is_create):
+        """
+        Collect the save requests for all changed categories and mark them unchanged.
+        """
         requests = dict()
 
-        for category_const,category_fields in self.fields.items():
+        # Categories which have not been accessed are empty and unchanged
+        for category_const,category_fields in self.fields.materialized_items():
             category = category_fields.category
 
             # Skip the logbook category, we do not manipulate this category ever.
@@ -389,4 +942,4 @@ class CMDBObject(collections.abc.Mapping):
             # but currently we do not process the output of the save process.
             category_fields.markUnchanged()
 
-        multi_method_request(requests)
+        return requests
@@ -0,0 +1,303 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections.abc
+import operator
+
+# Filters of `cmdb.objects` for equality conditions on object attributes
+_PUSHDOWN_FILTERS = { 'id': 'ids', 'type': 'type', 'title': 'title', 'sys_id': 'sysid' }
+
+
+def _isin(value, values):
+    return value in values
+
+
+def _contains(value, part):
+    return value is not None and part in value
+
+
+_OPERATORS = { 'eq': operator.eq,
+               'ne': operator.ne,
+               'lt': operator.lt,
+               'le': operator.le,
+               'gt': operator.gt,
+               'ge': operator.ge,
+               'isin': _isin,
+               'contains': _contains,
+             }
+
+
+class CMDBCondition:
+    """
+    A condition on objects, built by comparing :py:class:`CMDBField` or :py:class:`CMDBAttribute`
+    with values. Conditions are combined with ``&``, ``|`` and negated with ``~``.
+    """
+
+    def __and__(self, other):
+        return _Conjunction([ self, other ])
+
+    def __or__(self, other):
+        return _Disjunction([ self, other ])
+
+    def __invert__(self):
+        return _Negation(self)
+
+    def matches(self, obj):
+        """
+        Evaluate the condition on an object, loading its categories if required.
+        """
+        raise NotImplementedError()
+
+    def categories(self):
+        """
+        Return the set of category constants used by the condition.
+        """
+        return set()
+
+    def pushdown(self):
+        """
+        Return a filter of `cmdb.objects` which selects all objects matching the
+        condition, and possibly more.
+        """
+        return dict()
+
+
+class _Comparison(CMDBCondition):
+
+    def __init__(self, operand, op, value):
+        self.operand = operand
+        self.op = op
+        self.value = value
+
+    def matches(self, obj):
+        compare = _OPERATORS[self.op]
+        for value in self.operand._compared_values(obj, self.value):
+            try:
+                if compare(value, self.value):
+                    return True
+            except TypeError:
+                # e.g. ordering None or values of different types
+                pass
+        return False
+
+    def categories(self):
+        return self.operand.categories()
+
+    def pushdown(self):
+        if not isinstance(self.operand, CMDBAttribute) or self.operand.name not in _PUSHDOWN_FILTERS:
+            return dict()
+        key = _PUSHDOWN_FILTERS[self.operand.name]
+        if self.op == 'eq':
+            return { key: [ self.value ] if key == 'ids' else self.value }
+        if self.op == 'isin' and key == 'ids':
+            try:
+                return { key: sorted(self.value) }
+            except TypeError:
+                return { key: list(self.value) }
+        return dict()
+
+    def __repr__(self):
+        return "%r %s %r" % (self.operand, self.op, self.value)
+
+
+class _Conjunction(CMDBCondition):
+
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+    def __and__(self, other):
+        return _Conjunction(self.conditions + [ other ])
+
+    def matches(self, obj):
+        return all(condition.matches(obj) for condition in self.conditions)
+
+    def categories(self):
+        return set().union(*[ condition.categories() for condition in self.conditions ])
+
+    def pushdown(self):
+        filters = dict()
+        for condition in self.conditions:
+            for key, value in condition.pushdown().items():
+                if key == 'ids' and key in filters:
+                    filters[key] = [ ident for ident in filters[key] if ident in value ]
+                else:
+                    filters.setdefault(key, value)
+        return filters
+
+    def __repr__(self):
+        return '(' + ' & '.join(repr(condition) for condition in self.conditions) + ')'
+
+
+class _Disjunction(CMDBCondition):
+
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+    def __or__(self, other):
+        return _Disjunction(self.conditions + [ other ])
+
+    def matches(self, obj):
+        return any(condition.matches(obj) for condition in self.conditions)
+
+    def categories(self):
+        return set().union(*[ condition.categories() for condition in self.conditions ])
+
+    def __repr__(self):
+        return '(' + ' | '.join(repr(condition) for condition in self.conditions) + ')'
+
+
+class _Negation(CMDBCondition):
+
+    def __init__(self, condition):
+        self.condition = condition
+
+    def matches(self, obj):
+        return not self.condition.matches(obj)
+
+    def categories(self):
+        return self.condition.categories()
+
+    def __repr__(self):
+        return '~%r' % (self.condition,)
+
+
+class _Operand:
+
+    def __eq__(self, value):
+        return _Comparison(self, 'eq', self._convert(value))
+
+    def __ne__(self, value):
+        return _Comparison(self, 'ne', self._convert(value))
+
+    def __lt__(self, value):
+        return _Comparison(self, 'lt', self._convert(value))
+
+    def __le__(self, value):
+        return _Comparison(self, 'le', self._convert(value))
+
+    def __gt__(self, value):
+        return _Comparison(self, 'gt', self._convert(value))
+
+    def __ge__(self, value):
+        return _Comparison(self, 'ge', self._convert(value))
+
+    def isin(self, values):
+        """
+        Condition that the value is one of `values`.
+        """
+        values = [ self._convert(value) for value in values ]
+        if all(isinstance(value, collections.abc.Hashable) for value in values):
+            values = frozenset(values)
+        return _Comparison(self, 'isin', values)
+
+    def contains(self, part):
+        """
+        Condition that the value, a string or list, contains `part`.
+        """
+        return _Comparison(self, 'contains', part)
+
+    def _convert(self, value):
+        """
+        Convert a value compared with the operand to the type of its values.
+        """
+        return value
+
+    def values(self, obj):
+        raise NotImplementedError()
+
+    def _compared_values(self, obj, value):
+        """
+        Return the values of the operand of an object to compare with `value`.
+        """
+        return self.values(obj)
+
+    def categories(self):
+        return set()
+
+
+class CMDBField(_Operand):
+    """
+    A field of a category in conditions. For multi value categories a condition
+    holds if it holds for one of the entries. Objects whose type has not the
+    category don't match.
+
+    ::
+
+        cmdb.CMDBField('C__CATG__IP', 'hostname') == 'web01'
+        cmdb.CMDBField('C__CATG__MEMORY', 'capacity') >= 16
+
+    :param str category_const: category constant
+    :param str field: field of the category
+    """
+
+    def __init__(self, category_const, field):
+        self.category_const = category_const
+        self.field = field
+
+    def values(self, obj):
+        if not obj.hasTypeCategory(self.category_const):
+            return []
+        values = obj[self.category_const]
+        if isinstance(values, collections.abc.Mapping):
+            return [ values[self.field] ]
+        return [ entry[self.field] for entry in values ]
+
+    def categories(self):
+        return { self.category_const }
+
+    def __repr__(self):
+        return '%s.%s' % (self.category_const, self.field)
+
+
+class CMDBAttribute(_Operand):
+    """
+    An attribute of objects in conditions: ``id``, ``title``, ``sys_id``, ``status`` or
+    ``type``, which is compared by id and by constant. Equality conditions on ``id``,
+    ``title``, ``sys_id`` and ``type`` are passed to `cmdb.objects` by :py:func:`query_objects`.
+
+    ::
+
+        cmdb.CMDBAttribute('type') == 'C__OBJTYPE__SERVER'
+        cmdb.CMDBAttribute('id').isin([ 12, 13 ])
+
+    :param str name: name of the attribute
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _convert(self, value):
+        # Object ids are int, the condition and the pushed down filter compare alike
+        if self.name == 'id' and value is not None:
+            return int(value)
+        if self.name == 'type' and isinstance(value, str) and value.isdigit():
+            return int(value)
+        return value
+
+    def values(self, obj):
+        if self.name == 'type':
+            return [ obj.type, obj.type_object.get_const() ]
+        return [ getattr(obj, self.name) ]
+
+    def _compared_values(self, obj, value):
+        if self.name == 'type' and not isinstance(value, (frozenset, list)):
+            # Compare with one form only, otherwise e.g. ne holds for the other form
+            return [ obj.type_object.get_const() if isinstance(value, str) else obj.type ]
+        return self.values(obj)
+
+    def __repr__(self):
+        return self.name
@@ -15,221 +15,1023 @@
     along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from datetime import date, datetime
+import collections
 import configparser
+import gzip
+import itertools
 import json
 import logging
-import math
 import os
 import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from .exceptions import CMDBRequestError
+from . import stream
+from . import wirelog
+from .batch import AdaptiveBatchSizer
+from .codec import get_codec, json_serial, JSONCodec
+from .exceptions import CMDBRequestError, CMDBHTTPError, CMDBSessionExpired
+from .metadata import MetadataCache, MetadataSnapshot, schema_fingerprint
+from .sessionstore import SessionStore
+from .wirelog import enable_wire_log, disable_wire_log
 
 
-url = None
-apikey = None
+# Initial number of calls in one batch, the batch sizer adapts it at runtime.
+max_parameters = 512
 
+# Methods which only read data, identical calls of these are send only once per bulk request
+READ_METHODS = frozenset([ 'idoit.version',
+                           'cmdb.objects',
+                           'cmdb.object.read',
+                           'cmdb.object_types',
+                           'cmdb.object_type_categories',
+                           'cmdb.category.read',
+                           'cmdb.category_info',
+                           'cmdb.dialog.read',
+                         ])
 
-session = requests.Session()
-session_stats = { 'requests': 0,
-                  'queries': 0
-                }
+# JSON-RPC error codes with which i-doit rejects an invalid or expired session id
+SESSION_ERROR_CODES = frozenset([ -32604 ])
 
 
-def init_session(cmdb_url, cmdb_apikey, cmdb_username, cmdb_password,ssl_verify=False):
+def _read_config(instance):
+    config = configparser.ConfigParser()
+    config.read(['cmdbrc', os.path.expanduser('~/.cmdbrc')], encoding='utf8')
+    return config[instance]
+
+
+class CMDBClient:
     """
-    Initialise session.
+    A client for one i-doit instance.
 
-    :param url cmdb_url: url to the json api
-    :param str cmdb_apikey: i-doit apikey
-    :param str cmdb_username: username for authentication
-    :param str cmdb_password: password for authentication
+    The client owns the HTTP session with its connection pool, the credentials,
+    the request statistics and the caches of types, categories and dialogs. Several clients
+    can be used in one process, e.g. for different i-doit instances or one client
+    for each worker thread.
+
+    The module level functions like :py:func:`request` use the `default_client`,
+    which is configured by :py:func:`init_session` and :py:func:`init_session_from_config`.
+
+    :ivar requests.Session session: The HTTP session.
+    :ivar dict stats: Number of HTTP requests, JSON-RPC calls, bisected and deduplicated calls.
+    :ivar AdaptiveBatchSizer batch_sizer: Determines the size of the batches of bulk requests.
+    :ivar JSONCodec codec: Codec to encode requests and decode responses.
+    :ivar bool bisect_on_failure: Split and retry batches of reads which failed as a whole.
+    :ivar bool bisect_writes: Split and retry batches containing writes, too. A batch may fail
+                              after some of its writes have been committed, hence retrying it
+                              can e.g. create objects, dialog values or entries twice.
+    :ivar bool deduplicate_reads: Send identical read calls of a bulk request only once.
+    :ivar bool compress_requests: Compress request bodies with gzip, the server has to support this.
+    :ivar int compress_min_bytes: Request bodies smaller than this are not compressed.
+    :ivar SessionStore session_store: Store to reuse session ids across processes, see :py:meth:`set_session_store`.
+    :ivar MetadataCache metadata_cache: Store of the type and category metadata, see :py:meth:`set_metadata_cache`.
+    :ivar MetadataSnapshot metadata: Metadata of the instance in use, None without a metadata cache.
     """
-    global url, username, password, apikey, session
-    url = cmdb_url
-    username = cmdb_username
-    password = cmdb_password
-    apikey = cmdb_apikey
 
-    session.verify = ssl_verify
-    __session_configure()
+    def __init__(self, url=None, apikey=None, username=None, password=None, ssl_verify=False, concurrency=1, pool_size=10):
+        """
+        When `url` is given the client logs in immediately.
 
+        :param url url: url to the json api
+        :param str apikey: i-doit apikey
+        :param str username: username for authentication
+        :param str password: password for authentication
+        :param int concurrency: maximal number of concurrent requests, see :py:meth:`set_concurrency`
+        :param int pool_size: minimal number of pooled connections
+        """
+        self.url = url
+        self.apikey = apikey
+        self.username = username
+        self.password = password
 
-def init_session_from_config(instance='main'):
+        self.session = requests.Session()
+        self.session.verify = ssl_verify
+        # Name of the configured profile, the key of the session id in the session store
+        self.profile = None
+        self.session_store = None
+        self._login_lock = threading.Lock()
+        self.stats = { 'requests': 0,
+                       'queries': 0,
+                       'bisections': 0,
+                       'deduplicated': 0
+                     }
+        self._stats_lock = threading.Lock()
+
+        self.pool_size = pool_size
+        # Worker threads of multi_method_request, created on first use
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Number of streamed batches each thread is reading
+        self._stream_depth = threading.local()
+        self.set_concurrency(concurrency)
+
+        self.batch_sizer = AdaptiveBatchSizer(initial_calls=max_parameters)
+        self.bisect_on_failure = True
+        self.bisect_writes = False
+        self.deduplicate_reads = True
+        self.codec = get_codec()
+        self.compress_requests = False
+        self.compress_min_bytes = 4096
+        # Size of the chunks read from the connection by the streaming requests
+        self.stream_chunk_size = 64 * 1024
+
+        # Caches, the type mapping rules depend on the version of the instance
+        self.type_rules = None
+        self.metadata_cache = None
+        self.metadata = None
+        self._type_cache = None
+        self._category_cache = None
+        self._dialog_cache = None
+
+        # State of the asyncio client, see cmdb_idoit.aio
+        self._aio_session = None
+        self._aio_loop = None
+
+        if url is not None:
+            self.login()
+
+    @classmethod
+    def from_config(cls, instance='main'):
+        """
+        Create a client using a configured profile.
+
+        :param str instance: profile name, default is 'main'
+        """
+        client = cls()
+        client.configure_from_config(instance)
+        return client
+
+    def configure(self, url, apikey, username, password, ssl_verify=False, concurrency=1):
+        """
+        Set url and credentials and log in.
+        """
+        self.url = url
+        self.username = username
+        self.password = password
+        self.apikey = apikey
+
+        self.profile = None
+
+        self.session.verify = ssl_verify
+        self.set_concurrency(concurrency)
+        self._resume_session()
+        self._load_metadata()
+
+    def configure_from_config(self, instance='main'):
+        """
+        Set url and credentials from a configured profile and log in.
+
+        :param str instance: profile name, default is 'main'
+        """
+        config = _read_config(instance)
+        self.url = config.get('url')
+        self.username = config.get('username')
+        self.password = config.get('password')
+        self.apikey = config.get('apikey')
+        self.profile = instance
+
+        self.session.verify = config.get('verify',False)
+        self.set_concurrency(config.getint('concurrency',1))
+        if 'codec' in config:
+            self.set_codec(config.get('codec'))
+        self.compress_requests = config.getboolean('compress_requests',self.compress_requests)
+        if 'session_store' in config:
+            store = config.get('session_store')
+            if store.lower() in configparser.ConfigParser.BOOLEAN_STATES:
+                store = configparser.ConfigParser.BOOLEAN_STATES[store.lower()]
+            else:
+                store = os.path.expanduser(store)
+            self.set_session_store(store)
+        if 'metadata_cache' in config:
+            cache = config.get('metadata_cache')
+            if cache.lower() in configparser.ConfigParser.BOOLEAN_STATES:
+                cache = configparser.ConfigParser.BOOLEAN_STATES[cache.lower()]
+            else:
+                cache = os.path.expanduser(cache)
+            self.set_metadata_cache(cache, config.getfloat('metadata_cache_max_age', 86400))
+        self._resume_session()
+        self._load_metadata()
+
+    def set_concurrency(self, concurrency):
+        """
+        Set the number of requests the client is allowed to have in flight at the same time.
+
+        With a value greater than one :py:meth:`multi_method_request` dispatches its batches
+        through a pool of worker threads, which is kept by the client. The limit is enforced for the whole client, so
+        several threads issuing requests concurrently will not exceed it either. Batches
+        streamed by :py:meth:`iter_multi_method_request` are limited separately.
+
+        :param int concurrency: maximal number of concurrent requests, default is 1
+        """
+        concurrency = int(concurrency)
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1, but is %i" % concurrency)
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._stream_slots = threading.BoundedSemaphore(concurrency)
+        with self._executor_lock:
+            if self._executor is not None:
+                # Batches already submitted are still sent by the old workers
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+        # Keep enough pooled connections around for all in-flight requests
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency, self.pool_size))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def set_codec(self, codec):
+        """
+        Set the JSON codec used for requests and responses.
+
+        :param codec: a :py:class:`cmdb_idoit.codec.JSONCodec` or the name of a codec
+        """
+        if isinstance(codec, JSONCodec):
+            self.codec = codec
+        else:
+            self.codec = get_codec(codec)
+
+    def set_session_store(self, store):
+        """
+        Set the store in which the session id is kept after a login.
+
+        With a session store the client reuses a stored session id instead of logging
+        in when it is configured. When the i-doit instance rejects the session id, the
+        client logs in again and retries the request once.
+
+        :param store: a :py:class:`SessionStore`, the path of the store, True for the
+                      default path or None to disable the store
+        """
+        if store is True:
+            store = SessionStore()
+        elif not store:
+            store = None
+        elif not isinstance(store, SessionStore):
+            store = SessionStore(store)
+        self.session_store = store
+
+    def set_metadata_cache(self, cache, max_age=86400):
+        """
+        Set the store in which the metadata of types and categories is kept across processes.
+
+        When the client is configured, it loads the stored metadata of the instance and
+        checks with a single request whether the version or the object types of the instance
+        have changed since. Metadata loaded from the instance is added to the store.
+
+        :param cache: a :py:class:`MetadataCache`, the directory of the cache, True for the
+                      default directory or None to disable the cache
+        :param float max_age: seconds after which stored metadata is reloaded
+        """
+        if cache is True:
+            cache = MetadataCache(max_age=max_age)
+        elif not cache:
+            cache = None
+        elif not isinstance(cache, MetadataCache):
+            cache = MetadataCache(cache, max_age)
+        self.metadata_cache = cache
+        self.metadata = None
+
+    def _load_metadata(self):
+        """
+        Load the stored metadata of the instance, unless it is outdated.
+        """
+        if self.metadata_cache is None:
+            return
+        version, fingerprint, object_types = self._schema_fingerprint()
+        snapshot = self.metadata_cache.load(self.url)
+        if snapshot is None or snapshot.version != version or snapshot.fingerprint != fingerprint:
+            logging.debug("Metadata cache for %s is empty or outdated" % self.url)
+            snapshot = MetadataSnapshot(self.url, version, fingerprint)
+        self._use_metadata(snapshot)
+
+    def _schema_fingerprint(self):
+        result = self._request({ 'version': {'method': 'idoit.version', 'parameter': {}},
+                                 'types': {'method': 'cmdb.object_types', 'parameter': {}} }, True)
+        version = result['version']['version']
+        return version, schema_fingerprint(version, result['types']), result['types']
+
+    def _use_metadata(self, snapshot):
+        from .category.value_factory import _rules_for_version
+        self.metadata = snapshot
+        self.type_rules = _rules_for_version(snapshot.version)
+        for const in snapshot.none_api:
+            self.category_cache.setNoneAPICategory(const)
+
+    def flush_metadata(self):
+        """
+        Write newly loaded metadata to the metadata cache.
+        """
+        if self.metadata is not None and self.metadata.dirty:
+            self.metadata_cache.save(self.metadata)
+
+    def warm_metadata(self):
+        """
+        Load the metadata of all object types and their categories from the instance
+        in three bulk requests and replace the stored metadata.
+        """
+        if self.metadata_cache is None:
+            raise Exception("No metadata cache configured")
+        version, fingerprint, object_types = self._schema_fingerprint()
+        snapshot = MetadataSnapshot(self.url, version, fingerprint)
+
+        categories = self.multi_requests('cmdb.object_type_categories', { t['id']: {'type': t['id']} for t in object_types })
+        infos = dict()
+        for object_type in object_types:
+            type_categories = categories.get(object_type['id'], {})
+            snapshot.set_type(object_type, type_categories)
+            for kind, key, parameter in [ ('global', 'catg', 'catgID'), ('specific', 'cats', 'catsID'), ('custom', 'custom', None) ]:
+                for category in type_categories.get(key, []):
+                    call = { 'parameter': {'category': category['const']} if parameter is None else {parameter: category['id']},
+                             'method': 'cmdb.category_info' }
+                    infos[(kind, category['id'], category['const'])] = call
+
+        keys = list(infos.keys())
+        results = self.multi_method_request({ i: infos[key] for i, key in enumerate(keys) }, store_errors=True)
+        for i, (kind, ident, const) in enumerate(keys):
+            result = results.get(i)
+            if isinstance(result, CMDBRequestError):
+                if result.errnr == -32099:
+                    snapshot.add_none_api_category(const)
+            elif result is not None:
+                snapshot.set_category(kind, ident, const, result)
+
+        self.metadata_cache.save(snapshot)
+        self._use_metadata(snapshot)
+        return snapshot
+
+    def login(self):
+        """
+        Log in to the i-doit instance and use the session id for further requests.
+        """
+        wirelog.redact(self.apikey)
+
+        auth_header = { 'X-RPC-Auth-Username': self.username
+                      , 'X-RPC-Auth-Password': self.password
+                      , 'content-type': 'application/json'
+                      }
+        self.session.headers = auth_header
+
+        payload = { "id": 1 ,"method": "idoit.login", "params": { 'apikey': self.apikey }, "version": "2.0" }
+        response = self.session.post(self.url, data=json.dumps(payload,default=json_serial), stream=False)
+        response.raise_for_status()
+        rj = response.json()
+
+        if 'session-id' in rj['result']:
+            self._use_session(rj['result']['session-id'])
+            if self.session_store is not None:
+                self.session_store.set(self._session_key(), self.url, self.username, rj['result']['session-id'])
+        else:
+            self._use_session(None)
+            self.session.auth = requests.auth.HTTPBasicAuth(self.username, self.password)
+
+    def _use_session(self, session_id):
+        session_header = {'content-type': 'application/json',
+                          'Accept-Encoding': 'gzip, deflate'}
+        if session_id is not None:
+            wirelog.redact(session_id)
+            session_header['X-RPC-Auth-Session'] = session_id
+        self.session.headers = session_header
+
+    def _session_key(self):
+        if self.profile is not None:
+            return self.profile
+        return "%s %s" % (self.url, self.username)
+
+    def _resume_session(self):
+        """
+        Reuse the session id from the session store, or log in.
+        """
+        if self.session_store is not None:
+            session_id = self.session_store.get(self._session_key(), self.url, self.username)
+            if session_id is not None:
+                logging.debug("Reusing stored session for %s" % self.url)
+                self.session.auth = None
+                self._use_session(session_id)
+                return
+        self.login()
+
+    def _session_id(self):
+        return self.session.headers.get('X-RPC-Auth-Session')
+
+    def _renew_session(self, session_id):
+        """
+        Log in again after the session `session_id` was rejected. Threads which
+        hit the same rejected session log in only once.
+        """
+        with self._login_lock:
+            if self._session_id() != session_id:
+                return
+            logging.info("Session expired, logging in again")
+            if self.session_store is not None:
+                self.session_store.discard(self._session_key())
+            self.login()
+
+    @property
+    def type_cache(self):
+        """
+        The :py:class:`cmdb_idoit.CMDBTypeCache` of this client.
+        """
+        if self._type_cache is None:
+            from .type import CMDBTypeCache
+            self._type_cache = CMDBTypeCache()
+        return self._type_cache
+
+    @property
+    def category_cache(self):
+        """
+        The :py:class:`cmdb_idoit.CMDBCategoryCache` of this client.
+        """
+        if self._category_cache is None:
+            from .category.cache import CMDBCategoryCache
+            self._category_cache = CMDBCategoryCache()
+        return self._category_cache
+
+    @property
+    def dialog_cache(self):
+        """
+        The :py:class:`cmdb_idoit.CMDBDialogCache` of this client.
+        """
+        if self._dialog_cache is None:
+            from .dialog import CMDBDialogCache
+            self._dialog_cache = CMDBDialogCache()
+        return self._dialog_cache
+
+    def request(self, method, parameters):
+        """
+        Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
+        and error handling.
+        """
+        if not type(parameters) is dict:
+            raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+        results = self._request({ '1' : { 'method': method, 'parameter': parameters}},True)
+
+        if '1' in results:
+            res_json = results['1']
+        else:
+            return None
+
+        return res_json
+
+    def multi_requests(self, method, parameters):
+        """
+        Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
+        and connection error handling.
+        """
+        if not type(parameters) is dict:
+            raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+        if len(parameters) == 0:
+            return {}
+
+        return self.multi_method_request(_method_parameters(method, parameters))
+
+    def multi_method_request(self, parameters, store_errors=False, concurrency=None):
+        """
+        When we have more requests than the idoit system can handle then
+        we split them up and merge the results.
+
+        The size of the batches is determined by the `batch_sizer`, see :py:class:`AdaptiveBatchSizer`.
+        A batch which fails as a whole is split in half and both halves are retried.
+        Identical read calls, see `READ_METHODS`, are send only once and their result
+        is handed to every key requesting it.
+
+        Since this is a bulk operation, we don't do raise error handling on the results,
+        we assume that the code invoking this operation is deciding how to handle returned Exceptions.
+
+        :param dict parameters: requests, see :py:meth:`_request`
+        :param bool store_errors: store returned errors as :py:class:`CMDBRequestError` in the result
+        :param int concurrency: number of batches in flight at the same time,
+                                defaults to the client concurrency
+        """
+        unique, duplicates = self._deduplicate(parameters)
+        calls = self._encode_calls(unique)
+        if len(calls) == 0:
+            return {}
+
+        if concurrency is None:
+            concurrency = self.concurrency
+
+        result = dict()
+        # split is lazy, every batch is sized when it is submitted, i.e. after the
+        # batch sizer has seen the outcome of the preceding batches
+        batches = self.batch_sizer.split(calls)
+        batch = next(batches)
+        if len(batch) == len(calls) or concurrency <= 1:
+            # A single batch, or sequential, needs no worker threads
+            result.update(self._send_batch(batch,False,store_errors))
+            for batch in batches:
+                result.update(self._send_batch(batch,False,store_errors))
+            return _fan_out(parameters, result, duplicates)
+
+        executor = self._get_executor()
+        pending = collections.deque()
+        try:
+            for batch in itertools.chain([ batch ], batches):
+                pending.append(executor.submit(self._send_batch, batch, False, store_errors))
+                if len(pending) >= concurrency:
+                    # merge in order of the batches, hence the result has the same order
+                    result.update(pending.popleft().result())
+            while pending:
+                result.update(pending.popleft().result())
+        finally:
+            # Don't send the remaining batches when one failed
+            for future in pending:
+                future.cancel()
+        return _fan_out(parameters, result, duplicates)
+
+    def _get_executor(self):
+        """
+        Return the pool of worker threads, creating it on first use.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cmdb_idoit')
+            return self._executor
+
+    def iter_multi_requests(self, method, parameters, store_errors=False):
+        """
+        Streaming variant of :py:meth:`multi_requests`, see :py:meth:`iter_multi_method_request`.
+        """
+        if not type(parameters) is dict:
+            raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+        return self.iter_multi_method_request(_method_parameters(method, parameters),store_errors)
+
+    def iter_multi_method_request(self, parameters, store_errors=False):
+        """
+        Streaming variant of :py:meth:`multi_method_request`.
+
+        The responses are decoded incrementally while they are received and every
+        `(key, result)` pair is yielded as soon as it is decoded. Hence the memory
+        required is bounded by the largest single result instead of the whole batch.
+        The batches are requested one after another.
+
+        At most `concurrency` streamed batches are read at the same time, a batch counts
+        until its results are read or the generator is closed. Other requests of the client,
+        also from within the loop, aren't limited by streamed batches.
+
+        :param dict parameters: requests, see :py:meth:`_request`
+        :param bool store_errors: yield returned errors as :py:class:`CMDBRequestError`
+
+        :rtype: generator of `(key, result)` tuples
+        """
+        unique, duplicates = self._deduplicate(parameters)
+        calls = self._encode_calls(unique)
+        for batch in self.batch_sizer.split(calls):
+            for key, result in self._stream_batch(batch,store_errors):
+                yield (key, result)
+                for duplicate_key in duplicates.get(key, ()):
+                    yield (duplicate_key, result)
+
+    def _request(self, parameters, raise_errors, store_errors=False):
+        """
+        Sequentially handle multiple requests.
+
+        Keys of the given :py:class:`dict` are used as identifier, values should contain
+        a :py:class:`dict` with contain at least a 'parameter' and a 'method' key.
+
+        :param dict parameters: requests
+
+        :rtype: dict
+        """
+        calls = self._encode_calls(parameters)
+        if len(calls) == 0:
+            return {}
+        return self._send_batch(calls,raise_errors,store_errors)
+
+    def _send_batch(self, calls, raise_errors, store_errors, renew=True):
+        """
+        Send one batch of encoded calls, bisecting it when it fails as a whole.
+        When the session was rejected, log in again and retry once.
+        """
+        start = time.monotonic()
+        try:
+            result = self._post(calls,raise_errors,store_errors)
+        except CMDBSessionExpired as e:
+            if not renew:
+                raise e
+            self._renew_session(e.session_id)
+            return self._send_batch(calls,raise_errors,store_errors,False)
+        except CMDBHTTPError as e:
+            if not self._is_bisectable(e, calls):
+                raise e
+            self._record_bisection(e, calls)
+            half = len(calls) // 2
+            result = self._send_batch(calls[:half],raise_errors,store_errors,renew)
+            result.update(self._send_batch(calls[half:],raise_errors,store_errors,renew))
+            return result
+        self.batch_sizer.record(len(calls), time.monotonic() - start)
+        return result
+
+    def _record_bisection(self, error, calls):
+        self.batch_sizer.record_failure(len(calls))
+        with self._stats_lock:
+            self.stats['bisections'] += 1
+        logging.warning("Batch of %i calls failed (%s), retry in two batches" % (len(calls), error.message))
+
+    def _is_bisectable(self, error, calls):
+        # Server errors and none JSON responses (e.g. PHP fatal errors) affect the batch as a whole
+        if not self.bisect_on_failure or len(calls) <= 1 or 400 <= error.status_code < 500:
+            return False
+        # Writes of the batch may have been committed before it failed
+        return self.bisect_writes or all(method in READ_METHODS for key, call, method in calls)
+
+    def _post(self, calls, raise_errors, store_errors):
+        body = _join_calls(calls)
+        batch_id = wirelog.sample()
+        if batch_id is not None:
+            wirelog.record(batch_id, 'request', body, calls=len(calls))
+
+        data, headers = self._compress(body)
+        session_id = self._session_id()
+        start = time.monotonic()
+        with self._slots:
+            response = self.session.post(self.url, data=data, headers=headers, stream=False)
+        logging.debug("HTTP Request Header: %r", response.request.headers)
+        logging.debug("HTTP Response Header: %r", response.headers)
+        self._count_request(len(calls))
+
+        if batch_id is not None:
+            wirelog.record(batch_id, 'response', response.content, status=response.status_code, elapsed=round(time.monotonic() - start, 6))
+
+        _check_session_status(response.status_code, session_id)
+        _validate_response(response.status_code, response.headers, response.content)
+        res_jsons = self._decode_response(response.content)
+        _check_session_result(res_jsons, session_id)
+
+        return _process_results(res_jsons,raise_errors,store_errors)
+
+    def _stream_batch(self, calls, store_errors, renew=True):
+        start = time.monotonic()
+        try:
+            response, res_jsons, slots = self._post_streaming(calls)
+        except CMDBSessionExpired as e:
+            if not renew:
+                raise e
+            self._renew_session(e.session_id)
+            yield from self._stream_batch(calls,store_errors,False)
+            return
+        except CMDBHTTPError as e:
+            if not self._is_bisectable(e, calls):
+                raise e
+            self._record_bisection(e, calls)
+            half = len(calls) // 2
+            yield from self._stream_batch(calls[:half],store_errors,renew)
+            yield from self._stream_batch(calls[half:],store_errors,renew)
+            return
+
+        try:
+            for res_json in res_jsons:
+                item = _process_result(res_json,False,store_errors)
+                if item is not None:
+                    yield item
+        finally:
+            response.close()
+            self._release_stream_slot(slots)
+        self.batch_sizer.record(len(calls), time.monotonic() - start)
+
+    def _acquire_stream_slot(self):
+        """
+        Wait for a free slot of the streamed batches and return its semaphore, None for
+        batches streamed within the loop over another one of the same thread.
+        """
+        depth = getattr(self._stream_depth, 'value', 0)
+        # set_concurrency may replace the semaphore while the response is read
+        slots = self._stream_slots if depth == 0 else None
+        if slots is not None:
+            slots.acquire()
+        self._stream_depth.value = depth + 1
+        return slots
+
+    def _release_stream_slot(self, slots):
+        self._stream_depth.value = max(0, getattr(self._stream_depth, 'value', 0) - 1)
+        if slots is not None:
+            slots.release()
+
+    def _post_streaming(self, calls):
+        """
+        Send a batch and return the validated response, of which only the first
+        result is read, an iterator over the results and the acquired stream slot.
+        The slot is held until the results are read, the caller has to close the
+        response and pass the slot to :py:meth:`_release_stream_slot`.
+        """
+        body = _join_calls(calls)
+        batch_id = wirelog.sample()
+        if batch_id is not None:
+            wirelog.record(batch_id, 'request', body, calls=len(calls))
+
+        data, headers = self._compress(body)
+        session_id = self._session_id()
+        start = time.monotonic()
+        slots = self._acquire_stream_slot()
+        response = None
+        try:
+            response = self.session.post(self.url, data=data, headers=headers, stream=True)
+            logging.debug("HTTP Request Header: %r", response.request.headers)
+            logging.debug("HTTP Response Header: %r", response.headers)
+            self._count_request(len(calls))
+
+            if batch_id is not None:
+                wirelog.record(batch_id, 'response', '', status=response.status_code, elapsed=round(time.monotonic() - start, 6), streamed=True)
+
+            _check_session_status(response.status_code, session_id)
+            if response.status_code > 400 or response.headers.get('content-type', 'application/json') != 'application/json':
+                # The body is required for the error message
+                _validate_response(response.status_code, response.headers, response.content)
+
+            res_jsons = stream.iter_json_array(response.iter_content(chunk_size=self.stream_chunk_size), response.encoding or 'utf-8')
+            first = next(res_jsons, None)
+            if first is None:
+                return response, iter(()), slots
+            _check_session_result(first, session_id)
+        except BaseException:
+            if response is not None:
+                response.close()
+            self._release_stream_slot(slots)
+            raise
+        return response, itertools.chain([first], res_jsons), slots
+
+    def _encode_calls(self, parameters):
+        """
+        Serialize each request to its JSON-RPC representation.
+
+        Keys of the given :py:class:`dict` are used as identifier, values should contain
+        a :py:class:`dict` with contain at least a 'parameter' and a 'method' key.
+
+        :param dict parameters: requests, see :py:meth:`_request`
+
+        :rtype: list of `(key, encoded_call, method)` tuples
+        """
+        if not type(parameters) is dict:
+            raise TypeError('parameters not of type dict, but instead ', type(parameters))
+
+        calls = list()
+        for key, call in parameters.items():
+            parameter = call['parameter']
+            if not type(parameter) is dict:
+                raise TypeError('entry of parameters not of type dict, but instead ', type(parameter))
+            parameter['apikey'] = self.apikey
+            calls.append((key, self.codec.encode({
+                "id": key,
+                "method": call['method'],
+                "params": parameter,
+                "version": "2.0"}), call['method']))
+        return calls
+
+    def _compress(self, body):
+        """
+        Compress the request body if configured, return the body and additional headers.
+        """
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body, compresslevel=5), {'Content-Encoding': 'gzip'}
+        return body, None
+
+    def _decode_response(self, content):
+        try:
+            return self.codec.decode(content)
+        except Exception as e:
+            logging.error("multi_method_request: Failed to parse result",content)
+            # Try to decode the last line of the response.
+            try:
+              return self.codec.decode(content.splitlines()[-1])
+            except:
+              raise e
+
+    def _count_request(self, queries):
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['queries'] += queries
+
+    def _deduplicate(self, parameters):
+        """
+        Remove identical read calls from the requests.
+
+        :return: the remaining requests and a :py:class:`dict` mapping the key of each
+                 remaining call to the keys of its removed duplicates
+        """
+        if not self.deduplicate_reads or not type(parameters) is dict:
+            return parameters, {}
+
+        unique = dict()
+        duplicates = dict()
+        seen = dict()
+        for key, call in parameters.items():
+            if call['method'] in READ_METHODS:
+                signature = _call_signature(call)
+                if signature in seen:
+                    duplicates.setdefault(seen[signature], []).append(key)
+                    continue
+                seen[signature] = key
+            unique[key] = call
+
+        if len(duplicates) == 0:
+            return parameters, duplicates
+
+        saved = len(parameters) - len(unique)
+        logging.debug("Removed %i duplicated calls from bulk request" % saved)
+        with self._stats_lock:
+            self.stats['deduplicated'] += saved
+        return unique, duplicates
+
+
+def _method_parameters(method, parameters):
+    multi_parameters = dict()
+    for key, parameter in parameters.items():
+        multi_parameters[key] = { 'method': method,
+                            'parameter': parameter
+                          }
+    return multi_parameters
+
+def _call_signature(call):
+    parameter = call['parameter']
+    try:
+        return (call['method'], frozenset(parameter.items()))
+    except (TypeError, AttributeError):
+        return (call['method'], json.dumps(parameter, sort_keys=True, default=json_serial))
+
+def _fan_out(parameters, result, duplicates):
     """
-    Initialise session using a configured profile.
+    Hand the result of each call to its duplicates, keeping the order of the requests.
+    The duplicates share the result object.
+    """
+    if len(duplicates) == 0:
+        return result
+    for key, duplicate_keys in duplicates.items():
+        if key in result:
+            for duplicate_key in duplicate_keys:
+                result[duplicate_key] = result[key]
+    return { key: result[key] for key in parameters if key in result }
 
-    :param str instance: profile name, default is 'main'
+def _join_calls(calls):
     """
-    global url, username, password, apikey, session
-    config = configparser.ConfigParser()
-    config.read(['cmdbrc', os.path.expanduser('~/.cmdbrc')], encoding='utf8')
-    url = config[instance].get('url')
-    username = config[instance].get('username')
-    password = config[instance].get('password')
-    apikey = config[instance].get('apikey')
+    Join encoded calls to the body of a JSON-RPC batch request.
+    """
+    return b'[' + b','.join(call for key, call, method in calls) + b']'
 
-    session.verify = config[instance].get('verify',False)
-    __session_configure()
+def _validate_response(status_code, headers, content):
+    if status_code > 400:
+        text = content.decode('utf-8', 'replace')
+        raise CMDBHTTPError("HTTP-Error(%i): %s" % (status_code,text),status_code,text)
+
+    if 'content-type' in headers:
+        if not headers['content-type'] == 'application/json':
+            text = content.decode('utf-8', 'replace')
+            raise CMDBHTTPError("Response has unexpected content-type: %s" % headers['content-type'],status_code,text)
 
-def __session_configure():
-    global session, url, apikey, username, password
+def _check_session_status(status_code, session_id):
+    if status_code == 401 and session_id is not None:
+        raise CMDBSessionExpired("HTTP-Error(401): session rejected", session_id)
 
-    auth_header = { 'X-RPC-Auth-Username': username
-                  , 'X-RPC-Auth-Password': password
-                  , 'content-type': 'application/json'
-                  }
-    session.headers = auth_header
+def _check_session_result(res_jsons, session_id):
+    """
+    Raise :py:class:`CMDBSessionExpired` if the session was rejected. All calls of
+    a batch share the session, hence only the first result is inspected.
+    """
+    if session_id is None:
+        return
+    res_json = res_jsons
+    if isinstance(res_jsons, list):
+        if len(res_jsons) == 0:
+            return
+        res_json = res_jsons[0]
+    if isinstance(res_json, dict) and res_json.get('error') is not None:
+        if res_json['error'].get('code') in SESSION_ERROR_CODES:
+            raise CMDBSessionExpired(res_json['error'].get('message'), session_id)
 
-    payload = { "id": 1 ,"method": "idoit.login", "params": { 'apikey': apikey }, "version": "2.0" }
-    response = session.post(url, data=json.dumps(payload,default=__json_serial), stream=False)
-    response.raise_for_status()
-    rj = response.json()
+def _process_results(res_jsons,raise_errors,store_errors):
+    """
+    Map the JSON-RPC responses onto their request identifiers.
+    """
+    result = dict()
+    for res_json in res_jsons:
+        item = _process_result(res_json,raise_errors,store_errors)
+        if item is not None:
+            result[item[0]] = item[1]
+    return result
 
-    session_header = {'content-type': 'application/json'}
+def _process_result(res_json,raise_errors,store_errors):
+    """
+    Return the request identifier and the result of a single JSON-RPC response,
+    or None if the response is an error which should not be stored.
+    """
+    if 'error' in res_json and res_json['error'] is not None:
+        logging.debug(res_json)
+        error = CMDBRequestError(res_json['error']['message'],res_json['error']['code'])
+        if raise_errors:
+            raise error
+        if store_errors:
+            return (res_json['id'], error)
+        return None
+    return (res_json['id'], res_json['result'])
 
-    if 'session-id' in rj['result']:
-        session_header['X-RPC-Auth-Session'] = rj['result']['session-id']
-    else:
-        session.auth = requests.auth.HTTPBasicAuth(username, password)
 
-    session.headers = session_header
+default_client = CMDBClient()
 
+# The state of the default client, kept for compatibility.
+session = default_client.session
+session_stats = default_client.stats
+batch_sizer = default_client.batch_sizer
 
-def __json_serial(obj):
-    """JSON serializer for objects not serializable by default json code"""
+url = None
+apikey = None
+username = None
+password = None
 
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    elif isinstance(obj, CMDBRequestError):
-        return obj.message
-    raise TypeError ("Type %s not serializable" % type(obj))
 
-def request(method, parameters):
+def get_client(client=None):
     """
-    Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
-    and error handling.
+    Return `client`, or the `default_client` if `client` is None.
     """
-    global url
-    if not type(parameters) is dict:
-        raise TypeError('parameters not of type dict, but instead ', type(parameters))
+    if client is None:
+        return default_client
+    return client
 
-    results = __request({ '1' : { 'method': method, 'parameter': parameters}},True)
 
-    if '1' in results:
-        res_json = results['1']
-    else:
-        return None
+def _sync_globals():
+    global url, apikey, username, password
+    url = default_client.url
+    apikey = default_client.apikey
+    username = default_client.username
+    password = default_client.password
 
-    return res_json
 
-def multi_requests(method, parameters):
+def init_session(cmdb_url, cmdb_apikey, cmdb_username, cmdb_password,ssl_verify=False,concurrency=1):
     """
-    Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
-    and connection error handling.
+    Initialise session of the `default_client`.
+
+    :param url cmdb_url: url to the json api
+    :param str cmdb_apikey: i-doit apikey
+    :param str cmdb_username: username for authentication
+    :param str cmdb_password: password for authentication
+    :param int concurrency: maximal number of concurrent requests, see :py:func:`set_session_concurrency`
     """
-    global url
+    default_client.configure(cmdb_url, cmdb_apikey, cmdb_username, cmdb_password, ssl_verify, concurrency)
+    _sync_globals()
 
-    if not type(parameters) is dict:
-        raise TypeError('parameters not of type dict, but instead ', type(parameters))
 
-    if len(parameters) == 0:
-        return {}
+def init_session_from_config(instance='main'):
+    """
+    Initialise session of the `default_client` using a configured profile.
 
-    multi_parameters = dict()
-    for key, parameter in parameters.items():
-        multi_parameters[key] = { 'method': method,
-                            'parameter': parameter
-                          }
-    return multi_method_request(multi_parameters)
+    :param str instance: profile name, default is 'main'
+    """
+    default_client.configure_from_config(instance)
+    _sync_globals()
 
-def multi_method_request(parameters,store_errors=False):
+
+def set_session_concurrency(concurrency):
     """
-    When we have more requests than the idoit system can handle then
-    we split them up and merge the results.
+    Set the number of requests the session is allowed to have in flight at the same time,
+    see :py:meth:`CMDBClient.set_concurrency`.
 
-    Since this is a bulk operation, we don't do raise error handling on the results,
-    we assume that the code invoking this operation is deciding how to handle returned Exceptions.
+    :param int concurrency: maximal number of concurrent requests, default is 1
     """
-    max_parameters = 512
-    if len(parameters) > max_parameters:
-        length = len(parameters)
-        result = dict()
-        items = list(parameters.items())
-        for i in range(0,math.ceil(length / max_parameters)):
-          sub = dict(items[max_parameters * i:min(max_parameters * (i + 1),length)])
-          sub_result = __request(sub,False,store_errors)
-          result.update(sub_result)
-        return result
-    else:
-        return __request(parameters,False,store_errors)
+    default_client.set_concurrency(concurrency)
 
-def __request(parameters,raise_errors,store_errors=False):
+
+def set_codec(codec):
     """
-    Sequentially handle multiple requests.
+    Set the JSON codec used for requests and responses, see :py:meth:`CMDBClient.set_codec`.
 
-    Keys of the given :py:class:`dict` are used as identifier, values should contain
-    a :py:class:`dict` with contain at least a 'parameter' and a 'method' key.
+    :param codec: a :py:class:`cmdb_idoit.codec.JSONCodec` or the name of a codec
+    """
+    default_client.set_codec(codec)
 
-    :param dict parameters: requests
 
-    :rtype: dict
+def request(method, parameters):
     """
-    global url
-    if not type(parameters) is dict:
-        raise TypeError('parameters not of type dict, but instead ', type(parameters))
+    Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
+    and error handling.
+    """
+    return default_client.request(method, parameters)
 
-    if len(parameters) == 0:
-        return {}
 
-    payload = list()
-    for key, call in parameters.items():
-        parameter = call['parameter']
-        if not type(parameter) is dict:
-            raise TypeError('entry of parameters not of type dict, but instead ', type(parameter))
-        parameter['apikey'] = apikey
-        payload.append({
-            "id": key,
-            "method": call['method'],
-            "params": parameter,
-            "version": "2.0"})
+def multi_requests(method, parameters):
+    """
+    Call a JSON RPC `method` with given `parameters`. Automagically handling authentication
+    and connection error handling.
+    """
+    return default_client.multi_requests(method, parameters)
 
-    logging.debug('request_payload:' + json.dumps(payload, sort_keys=True, indent=4,default=__json_serial))
-    response = session.post(url, data=json.dumps(payload,default=__json_serial), stream=False)
-    logging.debug("HTTP Request Header:" + repr(response.request.headers))
-    logging.debug("HTTP Response Header:" + repr(response.headers))
-    session_stats['requests'] += 1
-    session_stats['queries'] += len(payload)
 
-    # Validate response
-    status_code = response.status_code
-    if status_code > 400:
-        raise Exception("HTTP-Error(%i): %s" % (status_code,response.text))
+def multi_method_request(parameters,store_errors=False,concurrency=None):
+    """
+    Send a bulk of requests, see :py:meth:`CMDBClient.multi_method_request`.
+    """
+    return default_client.multi_method_request(parameters,store_errors,concurrency)
 
-    if 'content-type' in response.headers:
-        if not response.headers['content-type'] == 'application/json':
-            raise Exception("Response has unexpected content-type: %s" % response.headers['content-type'],response.content)
-    try:
-        res_jsons = response.json()
-    except Exception as e:
-        logging.error("multi_method_request: Failed to parse result",response.content)
-        # Try to decode the last line of the response.
-        try:
-          res_jsons = json.loads(response.text.splitlines()[-1])
-        except:
-          raise e
 
-    result = dict()
-    for res_json in res_jsons:
-        if 'error' in res_json and res_json['error'] is not None:
-            logging.debug(res_json)
-            error = CMDBRequestError(res_json['error']['message'],res_json['error']['code'])
-            if raise_errors:
-                raise error
-            if store_errors:
-                result[res_json['id']] = error
-        else:
-            result[res_json['id']] = res_json['result']
+def iter_multi_requests(method, parameters, store_errors=False):
+    """
+    Streaming variant of :py:func:`multi_requests`, see :py:meth:`CMDBClient.iter_multi_method_request`.
+    """
+    return default_client.iter_multi_requests(method, parameters, store_errors)
 
-    logging.debug('result:' + json.dumps(result, sort_keys=True, indent=4,default=__json_serial))
-    return result
+
+def iter_multi_method_request(parameters,store_errors=False):
+    """
+    Streaming variant of :py:func:`multi_method_request`, see :py:meth:`CMDBClient.iter_multi_method_request`.
+    """
+    return default_client.iter_multi_method_request(parameters,store_errors)
@@ -0,0 +1,108 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import logging
+import os
+import stat
+import tempfile
+import time
+
+
+def cache_dir():
+    """
+    Return the directory for the files cached by cmdb_idoit, following the
+    XDG base directory specification.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'cmdb_idoit')
+
+
+class SessionStore:
+    """
+    Keeps the session ids of i-doit logins on disk, so short running processes
+    can reuse a session instead of logging in on every start.
+
+    The session ids are stored in a JSON file which is only accessible by its owner.
+    A file readable by other users is ignored. Concurrent writers do not corrupt
+    the file, but one of them might lose its entry, which costs a login at worst.
+
+    :param str path: path of the store, default is ``sessions.json`` in :py:func:`cache_dir`
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(cache_dir(), 'sessions.json')
+        self.path = path
+
+    def get(self, key, url, username):
+        """
+        Return the stored session id for `key`, or None if there is none or it
+        belongs to another instance or user.
+        """
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+        if entry.get('url') != url or entry.get('username') != username:
+            return None
+        return entry.get('session_id')
+
+    def set(self, key, url, username, session_id):
+        """
+        Store the `session_id` for `key`.
+        """
+        entries = self._read()
+        entries[key] = { 'url': url,
+                         'username': username,
+                         'session_id': session_id,
+                         'created': int(time.time())
+                       }
+        self._write(entries)
+
+    def discard(self, key):
+        """
+        Remove the session id of `key`.
+        """
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                if os.fstat(f.fileno()).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                    logging.warning("Ignoring session store %s, it is accessible by other users" % self.path)
+                    return {}
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logging.warning("Ignoring corrupt session store %s" % self.path)
+            return {}
+
+    def _write(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # mkstemp creates the file with mode 0600, replacing keeps readers consistent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.sessions-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,147 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _ChunkBuffer:
+    """
+    A text buffer which is refilled from an iterator of byte chunks.
+    Only the not yet consumed part of the text is kept.
+    """
+
+    def __init__(self, chunks, encoding):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self, minimum=1):
+        """
+        Read chunks until at least `minimum` additional characters are buffered.
+        Return False if the input is exhausted.
+        """
+        if self.exhausted:
+            return False
+        parts = [ self.text[self.pos:] ]
+        read = 0
+        while read < minimum:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                parts.append(self.decoder.decode(b'', final=True))
+                self.exhausted = True
+                break
+            part = self.decoder.decode(chunk)
+            parts.append(part)
+            read += len(part)
+        self.text = ''.join(parts)
+        self.pos = 0
+        return read > 0 or not self.exhausted
+
+    def skip(self, characters):
+        """
+        Skip the given characters, return the next character or None at the end of input.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in characters:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+
+
+def _skip_preamble(buf):
+    """
+    Skip anything in front of the JSON document, e.g. PHP notices, by searching
+    for the first line starting with '[' or '{'.
+    """
+    while True:
+        char = buf.skip(_WHITESPACE)
+        if char is None or char in '[{':
+            return char
+        newline = buf.text.find('\n', buf.pos)
+        while newline < 0:
+            buf.pos = len(buf.text)
+            if not buf.fill():
+                return None
+            newline = buf.text.find('\n', buf.pos)
+        buf.pos = newline + 1
+
+
+def iter_json_array(chunks, encoding='utf-8'):
+    """
+    Incrementally decode a JSON array from an iterator of byte chunks and
+    yield its elements one after another.
+
+    Only the currently decoded element and the not yet consumed input are held
+    in memory. A top level object instead of an array is yielded as single element.
+
+    :param chunks: iterable of :py:class:`bytes`
+    :param str encoding: encoding of the input
+    :raise json.JSONDecodeError: if the input is not a valid JSON array
+    """
+    decoder = json.JSONDecoder()
+    buf = _ChunkBuffer(chunks, encoding)
+
+    start = _skip_preamble(buf)
+    if start is None:
+        raise json.JSONDecodeError("Expecting value", buf.text, buf.pos)
+    if start == '{':
+        yield _decode_element(decoder, buf)
+        return
+
+    buf.pos += 1
+    expect_element = True
+    while True:
+        char = buf.skip(_WHITESPACE)
+        if char is None:
+            raise json.JSONDecodeError("Unterminated array", buf.text, buf.pos)
+        elif char == ']':
+            return
+        elif char == ',' and not expect_element:
+            buf.pos += 1
+            expect_element = True
+        elif expect_element:
+            yield _decode_element(decoder, buf)
+            expect_element = False
+        else:
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf.text, buf.pos)
+
+
+def _decode_element(decoder, buf):
+    while True:
+        try:
+            element, end = decoder.raw_decode(buf.text, buf.pos)
+        except json.JSONDecodeError:
+            # The element is incomplete, at least double the buffered input to keep
+            # the number of decode attempts logarithmic in the element size.
+            if not buf.fill(max(len(buf.text) - buf.pos, 1)):
+                raise
+            continue
+        if end == len(buf.text) and not buf.exhausted:
+            # A number at the end of the buffer might continue in the next chunk
+            if not isinstance(element, (dict, list, str)):
+                if buf.fill():
+                    continue
+        buf.pos = end
+        return element
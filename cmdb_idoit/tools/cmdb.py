@@ -27,7 +27,8 @@ import json
 @click.group()
 @click.option('--profile',help='Profile to use',default='main')
 @click.option('--debug/--no-debug',default=False)
-def cli(profile,debug):
+@click.option('--wire-log',help='Write the JSON-RPC traffic to this file',default=None)
+def cli(profile,debug,wire_log):
     if debug:
         # We want some informations
         logging.basicConfig(level=logging.DEBUG)
@@ -35,6 +36,9 @@ def cli(profile,debug):
         # Not so much informations
         logging.basicConfig(level=logging.INFO)
 
+    if wire_log:
+        cmdb.enable_wire_log(wire_log)
+
     # Load credentials
     cmdb.init_session_from_config(profile)
 
@@ -78,6 +82,28 @@ def _show_category_declaration(category, multi=False):
         if field_map is not None:
             print(" - mapped with %s" % field_map,end="")
     print("\n")
+@cli.group("cache")
+def cli_cache():
+    pass
+
+
+@cli_cache.command("warm")
+def cache_warm():
+  client = cmdb.default_client
+  if client.metadata_cache is None:
+    client.set_metadata_cache(True)
+  snapshot = client.warm_metadata()
+  print("Cached %i types and %i categories of i-doit %s in %s" % (len(snapshot.types), len(snapshot.categories), snapshot.version, client.metadata_cache.path))
+
+
+@cli_cache.command("clear")
+@click.option('--all','clear_all',is_flag=True,help="Clear the metadata of all instances")
+def cache_clear(clear_all):
+  client = cmdb.default_client
+  cache = client.metadata_cache or cmdb.MetadataCache()
+  cache.clear(None if clear_all else client.url)
+
+
 @cli.group("category")
 def cli_cat():
     pass
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import click
+import collections
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from cmdb_idoit.tools.synthetic import SyntheticInstance, RPCError
+
+# Body of the responses of injected failures, like PHP reports an exhausted memory limit
+_FATAL_ERROR = b"<br />\n<b>Fatal error</b>:  Allowed memory size of 134217728 bytes exhausted in <b>src/classes/components/isys_component_dao.class.php</b><br />\n"
+
+
+class StandinServer:
+    """
+    A local stand-in for the JSON-RPC API of i-doit, serving a :py:class:`SyntheticInstance`.
+
+    The server accepts every login and hands out session ids. Requests with an unknown
+    or expired session id are rejected like i-doit does. Latency and failures can be
+    injected to test and benchmark the client under realistic conditions.
+
+    ::
+
+        with StandinServer(SyntheticInstance(objects=10000), latency=0.02) as server:
+            client = server.client()
+            objects = cmdb.CMDBObjects(client=client)
+
+    :param SyntheticInstance instance: served instance, by default a generated one
+    :param str host: address to listen on
+    :param int port: port to listen on, 0 selects a free port
+    :param float latency: seconds each HTTP request is delayed
+    :param float call_latency: seconds each call of a batch adds to the delay
+    :param float failure_rate: fraction of HTTP requests which fail with a PHP fatal error
+    :param float error_rate: fraction of calls which fail with a JSON-RPC error
+    :param int max_batch_calls: batches with more calls fail with a PHP fatal error
+    :param float session_timeout: seconds after which a session expires, None for never
+    :param bool compress_responses: compress responses with gzip if the client accepts it
+    :param int seed: seed for the injected failures
+    """
+
+    def __init__(self, instance=None, host='127.0.0.1', port=0, latency=0.0, call_latency=0.0, failure_rate=0.0,
+                 error_rate=0.0, max_batch_calls=None, session_timeout=None, compress_responses=False, seed=0):
+        self.instance = instance if instance is not None else SyntheticInstance()
+        self.latency = latency
+        self.call_latency = call_latency
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.max_batch_calls = max_batch_calls
+        self.session_timeout = session_timeout
+        self.compress_responses = compress_responses
+
+        #: Number of HTTP requests, calls, injected failures and calls of each method
+        self.stats = collections.Counter()
+        self.sessions = dict()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+
+    @property
+    def url(self):
+        """
+        The url of the JSON-RPC endpoint.
+        """
+        host, port = self.httpd.server_address[:2]
+        return "http://%s:%i/src/jsonrpc.php" % (host, port)
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, **kwargs):
+        """
+        Return a :py:class:`cmdb_idoit.CMDBClient` logged in to this server.
+        """
+        from cmdb_idoit.session import CMDBClient
+        return CMDBClient(self.url, 'standin', 'standin', 'standin', **kwargs)
+
+    def expire_sessions(self):
+        """
+        Invalidate all session ids handed out so far.
+        """
+        with self._lock:
+            self.sessions.clear()
+
+    def handle(self, payload, session_id):
+        """
+        Process a decoded request body and return the response, or None if the
+        request has to fail as a whole.
+        """
+        calls = payload if isinstance(payload, list) else [ payload ]
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['calls'] += len(calls)
+            if self.max_batch_calls is not None and len(calls) > self.max_batch_calls:
+                self.stats['failures'] += 1
+                return None
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.stats['failures'] += 1
+                return None
+            session_valid = session_id is None or self._session_valid(session_id)
+            responses = [ self._call(call, session_valid) for call in calls ]
+
+        delay = self.latency + self.call_latency * len(calls)
+        if delay > 0:
+            time.sleep(delay)
+        return responses if isinstance(payload, list) else responses[0]
+
+    def _session_valid(self, session_id):
+        created = self.sessions.get(session_id)
+        if created is None:
+            return False
+        if self.session_timeout is not None and time.monotonic() - created > self.session_timeout:
+            del self.sessions[session_id]
+            return False
+        return True
+
+    def _call(self, call, session_valid):
+        if not isinstance(call, dict) or 'method' not in call:
+            return {'id': None, 'jsonrpc': '2.0', 'error': {'code': -32600, 'message': 'Invalid request', 'data': None}}
+        method = call['method']
+        self.stats[method] += 1
+        try:
+            if method == 'idoit.login':
+                session_id = uuid.uuid4().hex[:26]
+                self.sessions[session_id] = time.monotonic()
+                result = { 'result': True, 'userid': '9', 'name': 'Synthetic Api', 'mail': '', 'username': 'standin',
+                           'session-id': session_id, 'client-id': '1', 'client-name': 'Synthetic' }
+            elif method == 'idoit.logout':
+                result = {'message': 'Logout successfull', 'result': True}
+            elif not session_valid:
+                raise RPCError(-32604, "Session id invalid or expired")
+            elif self.error_rate and self._random.random() < self.error_rate:
+                raise RPCError(-32603, "Internal error: injected failure")
+            else:
+                result = self.instance.call(method, call.get('params') or {})
+        except RPCError as e:
+            return {'id': call.get('id'), 'jsonrpc': '2.0', 'error': {'code': e.code, 'message': e.message, 'data': None}}
+        return {'id': call.get('id'), 'jsonrpc': '2.0', 'result': result}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, avoid the delayed ACK of the client
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def do_POST(self):
+        standin = self.server.standin
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._send(200, 'application/json', json.dumps({'id': None, 'jsonrpc': '2.0', 'error': {'code': -32700, 'message': 'Parse error', 'data': None}}).encode('utf-8'))
+            return
+
+        response = standin.handle(payload, self.headers.get('X-RPC-Auth-Session'))
+        if response is None:
+            self._send(500, 'text/html; charset=UTF-8', _FATAL_ERROR)
+        else:
+            self._send(200, 'application/json', json.dumps(response, separators=(',', ':')).encode('utf-8'))
+
+    def _send(self, status, content_type, content):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if self.server.standin.compress_responses and 'gzip' in self.headers.get('Accept-Encoding', '') and len(content) > 1024:
+            content = gzip.compress(content, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='Address to listen on')
+@click.option('--port', default=8080, help='Port to listen on')
+@click.option('--types', default=8, help='Number of object types')
+@click.option('--categories', default=12, help='Number of categories of each type')
+@click.option('--objects', default=1000, help='Number of objects')
+@click.option('--version', default='1.13', help='Reported i-doit version')
+@click.option('--seed', default=0, help='Seed of the generated data')
+@click.option('--latency', default=0.0, help='Seconds each request is delayed')
+@click.option('--call-latency', default=0.0, help='Seconds each call of a batch adds to the delay')
+@click.option('--failure-rate', default=0.0, help='Fraction of requests failing with HTTP 500')
+@click.option('--error-rate', default=0.0, help='Fraction of calls failing with a JSON-RPC error')
+@click.option('--max-batch-calls', default=None, type=int, help='Fail batches with more calls')
+@click.option('--session-timeout', default=None, type=float, help='Seconds until sessions expire')
+@click.option('--gzip/--no-gzip', default=False, help='Compress responses')
+def main(host, port, types, categories, objects, version, seed, latency, call_latency, failure_rate, error_rate,
+         max_batch_calls, session_timeout, gzip):
+    """
+    Serve a synthetic i-doit instance for tests and benchmarks.
+    """
+    logging.basicConfig(level=logging.INFO)
+    instance = SyntheticInstance(types=types, categories_per_type=categories, objects=objects, version=version, seed=seed)
+    server = StandinServer(instance, host, port, latency=latency, call_latency=call_latency, failure_rate=failure_rate,
+                           error_rate=error_rate, max_batch_calls=max_batch_calls, session_timeout=session_timeout,
+                           compress_responses=gzip, seed=seed)
+    logging.info("Serving %i objects of %i types on %s" % (objects, types, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from array import array
+import random
+import re
+
+from cmdb_idoit.category.value_factory import _load_rules
+
+# Rule paths of the type mapping which can be generated, e.g. '$', '$.id' or '$[*].title'
+_RULE_PATH = re.compile(r'^\$(\[\*\])?(?:\.(\w+))?$')
+
+# data type, info type and a generator for the fields of categories without mapping rules
+_PLAIN_FIELDS = [ ('text', 'text', lambda rng: rng.choice(_WORDS)),
+                  ('int', 'int', lambda rng: str(rng.randint(0, 4096))),
+                  ('date', 'date', lambda rng: "20%02i-%02i-%02i" % (rng.randint(10, 25), rng.randint(1, 12), rng.randint(1, 28))),
+                  ('double', 'money', lambda rng: "%.2f EUR" % rng.uniform(10, 10000)),
+                  ('text_area', 'textarea', lambda rng: ' '.join(rng.choice(_WORDS) for i in range(8))),
+                  ('float', 'float', lambda rng: "%.2f" % rng.uniform(0, 100)),
+                  ('date_time', 'datetime', lambda rng: "20%02i-%02i-%02i %02i:%02i:%02i" % (rng.randint(10, 25), rng.randint(1, 12), rng.randint(1, 28),
+                                                                                           rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59))),
+                ]
+
+_WORDS = [ 'alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliett',
+           'kilo', 'lima', 'mike', 'november', 'oscar', 'papa', 'quebec', 'romeo', 'sierra', 'tango' ]
+
+_TYPE_CONSTS = [ 'C__OBJTYPE__SERVER', 'C__OBJTYPE__CLIENT', 'C__OBJTYPE__SWITCH', 'C__OBJTYPE__ROUTER',
+                 'C__OBJTYPE__PRINTER', 'C__OBJTYPE__APPLIANCE', 'C__OBJTYPE__VIRTUAL_SERVER', 'C__OBJTYPE__ACCESS_POINT' ]
+
+# Categories which exist in every type but can not be handled by the API
+_NONE_API_CATEGORIES = [ 'C__CATG__LOGBOOK' ]
+
+
+class RPCError(Exception):
+    """
+    A JSON-RPC error returned for a single call.
+    """
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class SyntheticField:
+    """
+    A field of a synthetic category.
+
+    :ivar str rule_type: type of the mapping rule, e.g. 'int' or 'list_text', or None
+    :ivar bool rule_list: the value is a list of objects
+    :ivar str rule_key: the key holding the value in each object, or None
+    """
+
+    def __init__(self, name, data_type, info_type, generator=None, rule_type=None, rule_list=False, rule_key=None):
+        self.name = name
+        self.data_type = data_type
+        self.info_type = info_type
+        self.generator = generator
+        self.rule_type = rule_type
+        self.rule_list = rule_list
+        self.rule_key = rule_key
+
+
+class SyntheticCategory:
+
+    def __init__(self, index, ident, const, kind, multi_value, fields, api=True):
+        self.index = index
+        self.id = ident
+        self.const = const
+        self.kind = kind
+        self.multi_value = multi_value
+        self.fields = fields
+        self.api = api
+        self.source_table = 'isys_%s_%s_list' % (kind, const.split('__')[-1].lower())
+
+
+class SyntheticInstance:
+    """
+    A generated i-doit instance implementing the JSON-RPC methods used by cmdb_idoit.
+
+    Categories and their fields follow the type mapping rules of the given i-doit version,
+    so values have the shapes of a real instance. Everything is derived from `seed`:
+    objects and category entries are generated when they are requested and only
+    entries which have been written are kept in memory.
+
+    :param int types: number of object types
+    :param int categories_per_type: number of API categories of each type
+    :param int objects: number of objects
+    :param int fields_per_category: number of fields of the categories without mapping rules
+    :param float multi_value_ratio: fraction of multi value categories
+    :param int entries_per_category: average number of entries of multi value categories
+    :param int dialog_size: number of values of each dialog
+    :param str version: i-doit version reported by `idoit.version`
+    :param int seed: seed of the generator
+    """
+
+    def __init__(self, types=8, categories_per_type=12, objects=1000, fields_per_category=8, multi_value_ratio=0.25,
+                 entries_per_category=3, dialog_size=8, version='1.13', seed=0):
+        self.version = version
+        self.seed = seed
+        self.entries_per_category = entries_per_category
+        self.dialog_size = dialog_size
+        self.fields_per_category = fields_per_category
+        self.multi_value_ratio = multi_value_ratio
+
+        self.categories = dict()
+        self.category_ids = dict()
+        self.types = list()
+        self.dialogs = dict()
+
+        # Written state, everything else is generated on demand
+        self._object_types = array('l')
+        self._objects = dict()
+        self._entries = dict()
+        self._next_entry = 1 << 40
+
+        rng = random.Random(seed)
+        self._build_categories(rng, types, categories_per_type)
+        self._build_types(rng, types, categories_per_type)
+        for i in range(objects):
+            self._object_types.append(rng.randrange(len(self.types)))
+
+    def _build_categories(self, rng, types, categories_per_type):
+        rules = _load_rules(self.version.replace('.', '_'))
+        counters = {'catg': 0, 'cats': 0, 'custom': 0}
+
+        def add(const, kind, fields, api=True):
+            counters[kind] += 1
+            multi_value = const != 'C__CATG__GLOBAL' and rng.random() < self.multi_value_ratio
+            category = SyntheticCategory(len(self.categories), counters[kind], const, kind, multi_value, fields, api)
+            self.categories[const] = category
+            self.category_ids[(kind, category.id)] = category
+
+        for const in sorted(rules):
+            kind = 'cats' if const.startswith('C__CATS__') else 'catg'
+            add(const, kind, self._mapped_fields(rng, const, rules[const]), const not in _NONE_API_CATEGORIES)
+
+        # Fill up the global categories, so each type can have its own set
+        wanted = types * categories_per_type // 2
+        number = 0
+        while sum(1 for c in self.categories.values() if c.kind == 'catg') < wanted:
+            number += 1
+            add('C__CATG__SYNTHETIC_%03i' % number, 'catg', self._plain_fields(rng))
+        for number in range(1, max(1, types // 2) + 1):
+            add('C__CATG__CUSTOM_FIELDS_SYNTHETIC_%i' % number, 'custom', self._plain_fields(rng))
+
+    def _mapped_fields(self, rng, const, rules):
+        fields = dict()
+        for name, rule in rules.items():
+            match = _RULE_PATH.match(rule['path'])
+            if match is None:
+                continue
+            rule_list = match.group(1) is not None
+            rule_key = match.group(2)
+            if rule['type'] in ('int', 'list_int') and rule_key in ('id', None):
+                data_type, info_type = 'int', 'dialog_plus'
+                if rule_list or rule['type'] == 'list_int':
+                    info_type = 'object_browser'
+                self.dialogs[(const, name)] = [ { 'id': str(i), 'const': '%s__%s_%i' % (const, name.upper(), i),
+                                                  'title': '%s %i' % (name, i) }
+                                                for i in range(1, self.dialog_size + 1) ]
+            elif rule['type'] in ('double', 'list_double', 'money'):
+                data_type, info_type = 'double', 'money' if rule['type'] == 'money' else 'float'
+            elif rule['type'].startswith('list_'):
+                data_type, info_type = 'text', 'multiselect'
+            else:
+                data_type, info_type = rule['type'], rule['type']
+            fields[name] = SyntheticField(name, data_type, info_type, rule_type=rule['type'], rule_list=rule_list, rule_key=rule_key)
+        fields['description'] = SyntheticField('description', 'text_area', 'textarea', _PLAIN_FIELDS[4][2])
+        return fields
+
+    def _plain_fields(self, rng):
+        fields = dict()
+        for i in range(self.fields_per_category):
+            data_type, info_type, generator = _PLAIN_FIELDS[(i + rng.randrange(len(_PLAIN_FIELDS))) % len(_PLAIN_FIELDS)]
+            name = '%s_%i' % (data_type, i)
+            fields[name] = SyntheticField(name, data_type, info_type, generator)
+        return fields
+
+    def _build_types(self, rng, types, categories_per_type):
+        api_categories = [ c for c in self.categories.values() if c.api ]
+        globals_ = [ c for c in api_categories if c.kind == 'catg' and c.const != 'C__CATG__GLOBAL' ]
+        specifics = [ c for c in api_categories if c.kind == 'cats' ]
+        customs = [ c for c in api_categories if c.kind == 'custom' ]
+        none_api = [ c for c in self.categories.values() if not c.api ]
+
+        for i in range(types):
+            if i < len(_TYPE_CONSTS):
+                const = _TYPE_CONSTS[i]
+            else:
+                const = 'C__OBJTYPE__SYNTHETIC_%i' % i
+            categories = [ self.categories['C__CATG__GLOBAL'] ] + none_api
+            categories.append(rng.choice(specifics))
+            if rng.random() < 0.5:
+                categories.append(rng.choice(customs))
+            categories += rng.sample(globals_, max(0, min(len(globals_), categories_per_type - len(categories) + len(none_api))))
+            title = const.split('__')[-1].replace('_', ' ').title()
+            self.types.append({ 'id': str(i + 1),
+                                'title': title,
+                                'container': '0',
+                                'const': const,
+                                'color': 'ABCDEF',
+                                'image': '',
+                                'icon': '',
+                                'cats': '',
+                                'tree_group': '1',
+                                'status': '2',
+                                'type_group': '1',
+                                'type_group_title': 'Infrastructure',
+                                'categories': categories,
+                                'short': title.replace(' ', '').lower()[:8]
+                              })
+
+    def call(self, method, params):
+        """
+        Execute the JSON-RPC `method`.
+
+        :raise RPCError: if the call fails
+        """
+        if not isinstance(params, dict):
+            raise RPCError(-32602, "Invalid parameters")
+        handler = self._methods.get(method)
+        if handler is None:
+            raise RPCError(-32601, "Method not found: %s" % method)
+        return handler(self, params)
+
+    # Objects
+
+    def _type_by_ident(self, ident):
+        if ident is None:
+            return None
+        for index, object_type in enumerate(self.types):
+            if str(ident) in (object_type['id'], object_type['const']):
+                return index
+        raise RPCError(-32602, "Unknown object type %s" % ident)
+
+    def _has_object(self, object_id):
+        return 0 < object_id <= len(self._object_types)
+
+    def _object(self, object_id):
+        object_type = self.types[self._object_types[object_id - 1]]
+        written = self._objects.get(object_id, {})
+        return { 'id': str(object_id),
+                 'title': written.get('title', '%s-%06i' % (object_type['short'], object_id)),
+                 'sysid': 'SYSID_%010i' % (1500000000 + object_id),
+                 'type': object_type['id'],
+                 'created': '2019-01-01 12:00:00',
+                 'updated': written.get('updated', '2019-01-01 12:00:00'),
+                 'type_title': object_type['title'],
+                 'type_group_title': object_type['type_group_title'],
+                 'status': '2',
+                 'cmdb_status': '6',
+                 'cmdb_status_title': 'in operation',
+                 'image': ''
+               }
+
+    def _objects_read(self, params):
+        filters = params.get('filter') or dict()
+        ids = range(1, len(self._object_types) + 1)
+        if 'ids' in filters:
+            ids = sorted(set(int(i) for i in filters['ids'] if self._has_object(int(i))))
+        type_index = self._type_by_ident(filters.get('type'))
+
+        objects = list()
+        for object_id in ids:
+            if type_index is not None and self._object_types[object_id - 1] != type_index:
+                continue
+            obj = self._object(object_id)
+            if 'title' in filters and obj['title'] != filters['title']:
+                continue
+            if 'sysid' in filters and obj['sysid'] != filters['sysid']:
+                continue
+            objects.append(obj)
+
+        order_by = params.get('order_by', 'id')
+        if order_by != 'id':
+            objects.sort(key=lambda obj: obj.get(order_by, ''))
+        if str(params.get('sort', 'ASC')).upper() == 'DESC':
+            objects.reverse()
+
+        limit = params.get('limit')
+        if limit:
+            if isinstance(limit, str) and ',' in limit:
+                offset, count = [ int(part) for part in limit.split(',', 1) ]
+            else:
+                offset, count = 0, int(limit)
+            objects = objects[offset:offset + count]
+        return objects
+
+    def _object_read(self, params):
+        object_id = int(params.get('id', 0))
+        if not self._has_object(object_id):
+            return []
+        return self._object(object_id)
+
+    def _object_create(self, params):
+        type_index = self._type_by_ident(params.get('type'))
+        if type_index is None:
+            raise RPCError(-32602, "Parameter type is missing")
+        self._object_types.append(type_index)
+        object_id = len(self._object_types)
+        if 'title' in params:
+            self._objects[object_id] = {'title': str(params['title'])}
+        return {'id': object_id, 'message': 'Object was successfully created', 'success': True}
+
+    def _object_update(self, params):
+        object_id = int(params.get('id', 0))
+        if not self._has_object(object_id):
+            raise RPCError(-32602, "Object %s does not exist" % object_id)
+        if 'title' in params:
+            self._objects.setdefault(object_id, {})['title'] = str(params['title'])
+        return {'success': True, 'message': 'Object title was successfully updated'}
+
+    # Types and categories
+
+    def _object_types_read(self, params):
+        filters = params.get('filter') or dict()
+        result = list()
+        for object_type in self.types:
+            if 'id' in filters and str(filters['id']) not in (object_type['id'], object_type['const']):
+                continue
+            if 'ids' in filters and object_type['id'] not in [ str(i) for i in filters['ids'] ]:
+                continue
+            if 'const' in filters and filters['const'] != object_type['const']:
+                continue
+            if 'title' in filters and filters['title'] != object_type['title']:
+                continue
+            result.append({ key: value for key, value in object_type.items() if key not in ('categories', 'short') })
+        return result
+
+    def _object_type_categories(self, params):
+        object_type = self.types[self._type_by_ident(params.get('type'))]
+        result = dict()
+        for category in object_type['categories']:
+            result.setdefault(category.kind, []).append({ 'id': str(category.id),
+                                                          'title': category.const.split('__')[-1].replace('_', ' ').title(),
+                                                          'const': category.const,
+                                                          'multi_value': '1' if category.multi_value else '0',
+                                                          'source_table': category.source_table
+                                                        })
+        return result
+
+    def _category_by_parameter(self, params):
+        if 'catgID' in params:
+            category = self.category_ids.get(('catg', int(params['catgID'])))
+        elif 'catsID' in params:
+            category = self.category_ids.get(('cats', int(params['catsID'])))
+        elif 'customID' in params:
+            category = self.category_ids.get(('custom', int(params['customID'])))
+        else:
+            category = self.categories.get(params.get('category'))
+        if category is None:
+            raise RPCError(-32602, "Category not found")
+        if not category.api:
+            raise RPCError(-32099, "Category %s is not supported by the API" % category.const)
+        return category
+
+    def _category_info(self, params):
+        category = self._category_by_parameter(params)
+        info = dict()
+        for name, field in category.fields.items():
+            info[name] = { 'title': name.replace('_', ' ').title(),
+                           'check': {'mandatory': False},
+                           'info': { 'primary_field': False,
+                                     'type': field.info_type,
+                                     'backward': False,
+                                     'title': name,
+                                     'description': ''
+                                   },
+                           'data': { 'type': field.data_type,
+                                     'readonly': False,
+                                     'index': False,
+                                     'field': '%s__%s' % (category.source_table[:-5], name)
+                                   },
+                           'ui': {'type': field.info_type, 'id': 'C__%s__%s' % (category.const, name.upper())}
+                         }
+        return info
+
+    # Category entries
+
+    def _generate_entries(self, object_id, category):
+        rng = random.Random(((self.seed * 1000003) + object_id) * 1000003 + category.index)
+        if category.multi_value:
+            count = rng.randint(0, 2 * self.entries_per_category)
+        else:
+            count = 1
+        entries = list()
+        for i in range(count):
+            entry = {'id': str(object_id * 64 + i), 'objID': str(object_id)}
+            for name, field in category.fields.items():
+                entry[name] = self._generate_value(rng, category, field)
+            if category.const == 'C__CATG__GLOBAL':
+                entry['title'] = self._object(object_id)['title']
+            entries.append(entry)
+        return entries
+
+    def _generate_value(self, rng, category, field):
+        if field.rule_type is None:
+            return field.generator(rng)
+        if field.rule_list:
+            count = rng.randint(0, 3) if field.rule_type.startswith('list_') else 1
+            return [ self._generate_element(rng, category, field) for i in range(count) ]
+        return self._generate_element(rng, category, field)
+
+    def _generate_element(self, rng, category, field):
+        dialog = self.dialogs.get((category.const, field.name))
+        if dialog is not None:
+            return dict(dialog[rng.randrange(len(dialog))], title_lang=field.name)
+        rule_type = field.rule_type.replace('list_', '')
+        if rule_type == 'int':
+            value = str(rng.randint(0, 1))
+        elif rule_type == 'double':
+            value = "%.2f" % rng.uniform(0, 100)
+        elif rule_type == 'money':
+            value = "%.2f EUR" % rng.uniform(10, 10000)
+        else:
+            value = rng.choice(_WORDS)
+        if field.rule_key is None:
+            return value
+        return {field.rule_key: value, 'title': value}
+
+    def _entries_of(self, object_id, category):
+        key = (object_id, category.const)
+        if key in self._entries:
+            return self._entries[key]
+        return self._generate_entries(object_id, category)
+
+    def _writable_entries(self, object_id, category):
+        key = (object_id, category.const)
+        if key not in self._entries:
+            self._entries[key] = self._generate_entries(object_id, category)
+        return self._entries[key]
+
+    def _object_category(self, params):
+        object_id = int(params.get('objID', params.get('object', 0)))
+        if not self._has_object(object_id):
+            raise RPCError(-32602, "Object %s does not exist" % object_id)
+        category = self._category_by_parameter(params)
+        if category not in self.types[self._object_types[object_id - 1]]['categories']:
+            return object_id, None
+        return object_id, category
+
+    def _category_read(self, params):
+        object_id, category = self._object_category(params)
+        if category is None:
+            return []
+        return self._entries_of(object_id, category)
+
+    def _category_save(self, params):
+        object_id, category = self._object_category(params)
+        if category is None:
+            raise RPCError(-32602, "Category is not assigned to the type of object %s" % object_id)
+        entries = self._writable_entries(object_id, category)
+
+        entry = None
+        if 'entry' in params:
+            entry = next((e for e in entries if e['id'] == str(params['entry'])), None)
+            if entry is None:
+                raise RPCError(-32602, "Entry %s does not exist" % params['entry'])
+        elif not category.multi_value and len(entries) > 0:
+            entry = entries[0]
+        if entry is None:
+            self._next_entry += 1
+            entry = {'id': str(self._next_entry), 'objID': str(object_id)}
+            entry.update((name, None) for name in category.fields)
+            entries.append(entry)
+
+        for name, value in (params.get('data') or {}).items():
+            if name in category.fields:
+                entry[name] = self._stored_value(category, category.fields[name], value)
+        return {'success': True, 'message': 'Category entry successfully saved', 'entry': int(entry['id'])}
+
+    def _stored_value(self, category, field, value):
+        """
+        Convert a written value to the representation returned by `cmdb.category.read`.
+        """
+        if value is None:
+            return None
+        if field.rule_type is None:
+            if field.info_type == 'money':
+                return "%.2f EUR" % float(value)
+            elif field.data_type == 'date':
+                return str(value)[:10]
+            elif field.data_type == 'date_time':
+                return str(value).replace('T', ' ')[:19]
+            return str(value)
+
+        dialog = { entry['id']: entry for entry in self.dialogs.get((category.const, field.name), []) }
+        def element(item):
+            if field.rule_key is None:
+                return str(item)
+            if str(item) in dialog:
+                return dict(dialog[str(item)])
+            return {field.rule_key: str(item), 'title': str(item)}
+
+        if field.rule_list:
+            if not isinstance(value, list):
+                value = [ value ]
+            return [ element(item) for item in value ]
+        elif isinstance(value, list):
+            return element(value[0]) if len(value) > 0 else None
+        return element(value)
+
+    def _category_delete(self, params):
+        object_id, category = self._object_category(params)
+        entry_id = str(params.get('id', params.get('entry')))
+        entries = self._writable_entries(object_id, category) if category is not None else []
+        for index, entry in enumerate(entries):
+            if entry['id'] == entry_id:
+                del entries[index]
+                return {'success': True, 'message': 'Entry %s has been successfully purged' % entry_id}
+        raise RPCError(-32602, "Entry %s does not exist" % entry_id)
+
+    # Dialogs and version
+
+    def _dialog_read(self, params):
+        return self.dialogs.get((params.get('category'), params.get('property')), [])
+
+    def _dialog_create(self, params):
+        key = (params.get('category'), params.get('property'))
+        if key[0] not in self.categories:
+            raise RPCError(-32602, "Category not found")
+        dialog = self.dialogs.setdefault(key, [])
+        entry_id = str(max([ int(entry['id']) for entry in dialog ] + [ 0 ]) + 1)
+        dialog.append({'id': entry_id, 'const': '', 'title': str(params.get('value'))})
+        return {'success': True, 'entry_id': entry_id, 'message': 'Dialog entry successfully created'}
+
+    def _version(self, params):
+        return { 'login': { 'userid': '9',
+                            'name': 'Synthetic Api',
+                            'mail': '',
+                            'username': 'api',
+                            'mandator': 'Synthetic',
+                            'language': 'en'
+                          },
+                 'version': self.version,
+                 'step': '',
+                 'type': 'PRO'
+               }
+
+    _methods = { 'idoit.version': _version,
+                 'cmdb.objects': _objects_read,
+                 'cmdb.object.read': _object_read,
+                 'cmdb.object.create': _object_create,
+                 'cmdb.object.update': _object_update,
+                 'cmdb.object_types': _object_types_read,
+                 'cmdb.object_type_categories': _object_type_categories,
+                 'cmdb.category_info': _category_info,
+                 'cmdb.category.read': _category_read,
+                 'cmdb.category.save': _category_save,
+                 'cmdb.category.delete': _category_delete,
+                 'cmdb.dialog.read': _dialog_read,
+                 'cmdb.dialog.create': _dialog_create,
+               }
@@ -22,6 +22,7 @@ from cmdb_idoit.category import get_category, fetch_categories
 from cmdb_idoit.category.category import CMDBCategoryType, getCategoryValueObject
 
 import collections.abc
+import types
 
 class CMDBTypeCache(collections.abc.MutableMapping):
 
@@ -64,32 +65,122 @@ class CMDBTypeCache(collections.abc.MutableMapping):
 
 
 
-cmdbTypeCache = CMDBTypeCache()
+cmdbTypeCache = default_client.type_cache
 
 
-def get_cmdb_type(type_id):
-    if type_id in cmdbTypeCache:
-        return cmdbTypeCache[type_id]
+def get_cmdb_type(type_id, client=None):
+    client = get_client(client)
+    if type_id in client.type_cache:
+        return client.type_cache[type_id]
     else:
-        return CMDBType(type_id)
+        return CMDBType(type_id, client)
 
 
-def get_type_id_from_const(type_const):
+def get_type_id_from_const(type_const, client=None):
     """
     Returns the type constant for an given type id.
     """
-    cmdb_type = get_cmdb_type(type_const)
+    cmdb_type = get_cmdb_type(type_const, client)
     return cmdb_type.get_id()
 
 
-def get_type_const_from_id(type_id):
+def get_type_const_from_id(type_id, client=None):
     """
     Returns the type id for an given type const.
     """
-    cmdb_type = get_cmdb_type(type_id)
+    cmdb_type = get_cmdb_type(type_id, client)
     return cmdb_type.get_const()
 
 
+def preload_types(types=None, client=None):
+    """
+    Load object types together with their categories into the type and category cache.
+
+    Instead of three requests per type, all types are loaded with one request for the
+    types, one bulk request for the categories of the types and one bulk request for
+    the fields of all categories. Types which are already cached are skipped.
+
+    :param list types: ids or constants of the types to load, by default all types
+    :param CMDBClient client: Client to use, defaults to the `default_client`.
+    :return: the requested types
+    :rtype: list of CMDBType
+    """
+    client = get_client(client)
+    metadata = client.metadata
+    if types is not None:
+        # Ids are cached as int, accept them as numeric strings like get_cmdb_type
+        types = [ int(ident) if isinstance(ident, str) and ident.isdigit() else ident for ident in types ]
+
+    results = dict()
+    missing = list()
+    wanted = None if types is None else [ ident for ident in types if ident not in client.type_cache ]
+    for ident in (wanted or []):
+        cached = metadata.get_type(ident) if metadata is not None else None
+        if cached is not None:
+            results[str(cached[0]['id'])] = cached
+        else:
+            missing.append(ident)
+
+    if types is None or len(missing) > 0:
+        object_types = client.request('cmdb.object_types', {})
+        if types is None:
+            selected = [ t for t in object_types if int(t['id']) not in client.type_cache ]
+        else:
+            by_ident = dict()
+            for object_type in object_types:
+                by_ident[object_type['id']] = object_type
+                by_ident[object_type['const']] = object_type
+            selected = list()
+            for ident in missing:
+                if str(ident) not in by_ident:
+                    raise CMDBUnkownType(f"Unkown type { ident }")
+                selected.append(by_ident[str(ident)])
+        for object_type in selected:
+            cached = metadata.get_type(object_type['id']) if metadata is not None else None
+            results[object_type['id']] = cached if cached is not None else (object_type, None)
+
+    fetch = { type_id: {'type': type_id} for type_id, (_, categories_result) in results.items() if categories_result is None }
+    if len(fetch) > 0:
+        categories_results = client.multi_requests('cmdb.object_type_categories', fetch)
+        for type_id in fetch:
+            object_type = results[type_id][0]
+            categories_result = categories_results.get(type_id, {})
+            results[type_id] = (object_type, categories_result)
+            if metadata is not None:
+                metadata.set_type(object_type, categories_result)
+
+    categories_parameter = list()
+    for _, categories_result in results.values():
+        categories_parameter += [ {'id': category['id'], 'const': category['const'], 'global': category_type}
+                                  for category_type, category in _type_categories(categories_result) ]
+    fetch_categories(categories_parameter, client)
+
+    for type_id, (object_type, categories_result) in results.items():
+        if int(type_id) not in client.type_cache:
+            CMDBType(type_id, client, object_type, categories_result)
+    client.flush_metadata()
+
+    if types is None:
+        return list(client.type_cache.values())
+    return [ client.type_cache[ident] for ident in types ]
+
+
+def _type_categories(result):
+    """
+    Returns `(category_type, category)` tuples of a `cmdb.object_type_categories` result.
+    """
+    categories = list()
+    if 'catg' in result:
+        categories += [(CMDBCategoryType.type_global, c) for c in result['catg']]
+
+    if 'cats' in result:
+        categories += [(CMDBCategoryType.type_specific, c) for c in result['cats']]
+
+    if 'custom' in result:
+        categories += [(CMDBCategoryType.type_custom, c) for c in result['custom']]
+    return categories
+
+
 class CMDBType:
 
     class CMDBTypeCategoryInclusion:
@@ -98,7 +189,14 @@ class CMDBType:
         parent = None
         category = None
 
-    def __init__(self, type_id):
+    def __init__(self, type_id, client=None, result=None, categories_result=None):
+        """
+        :param type_id: id or constant of the type
+        :param CMDBClient client: Client to use, defaults to the `default_client`.
+        :param dict result: Already fetched entry of the `cmdb.object_types` result.
+        :param dict categories_result: Already fetched result of `cmdb.object_type_categories`.
+        """
+        self.client = get_client(client)
         self.id = None
         self.const = None
         self.status = 0
@@ -107,9 +205,10 @@ class CMDBType:
         self.global_categories = dict()
         self.specific_categories = dict()
         self.custom_categories= dict()
+        self._object_template = None
 
-        self._load(type_id)
-        cmdbTypeCache[self.get_id()] = self
+        self._load(type_id, result, categories_result)
+        self.client.type_cache[self.get_id()] = self
 
     def get_id(self):
         return self.id
@@ -120,15 +219,21 @@ class CMDBType:
     def get_type_group():
         return self.meta['type_group']
 
-    def _load(self, type_id):
+    def _load(self, type_id, result=None, categories_result=None):
 
-        result = request('cmdb.object_types', {'filter': {'id': type_id}})
+        metadata = self.client.metadata
+        cached = metadata.get_type(type_id) if metadata is not None and result is None else None
+        if cached is not None:
+            result, categories_result = cached
+        elif result is None:
+            result = self.client.request('cmdb.object_types', {'filter': {'id': type_id}})
 
-        if len(result) == 0:
-            raise CMDBUnkownType(f"Unkown type { type_id }")
-            return
+            if len(result) == 0:
+                raise CMDBUnkownType(f"Unkown type { type_id }")
+                return
 
-        result = result.pop()
+            result = result.pop()
+            categories_result = None
 
         self.id = int(result['id'])
         self.const = result['const']
@@ -140,24 +245,20 @@ class CMDBType:
 
         logging.debug("Loading type %s" % self.get_const())
 
-        result = request('cmdb.object_type_categories', {'type': self.get_id()})
+        if categories_result is None:
+            categories_result = self.client.request('cmdb.object_type_categories', {'type': self.get_id()})
+            if metadata is not None:
+                metadata.set_type(result, categories_result)
+        result = categories_result
 
         # process structural information about categories
-        categories = list()
-        if 'catg' in result:
-            categories += [(CMDBCategoryType.type_global, c) for c in result['catg']]
-
-        if 'cats' in result:
-            categories += [(CMDBCategoryType.type_specific, c) for c in result['cats']]
-
-        if 'custom' in result:
-            categories += [(CMDBCategoryType.type_custom, c) for c in result['custom']]
+        categories = _type_categories(result)
 
         categories_parameter = list()
         for category_type, category in categories:
             categories_parameter.append({'id': category['id'], 'const': category['const'], 'global': category_type})
         logging.debug("Fetch categories for type %s" % self.const)
-        fetch_categories(categories_parameter)
+        fetch_categories(categories_parameter, self.client)
 
         for glob, cat in categories:
             logging.debug("Loading category %s" % cat['const'])
@@ -168,7 +269,7 @@ class CMDBType:
             category_type_inclusion.source_table = cat['source_table']
             
             try:
-                category_object = get_category(category_const=cat['const'], category_id=cat['id'], category_type=glob)
+                category_object = get_category(category_const=cat['const'], category_id=cat['id'], category_type=glob, client=self.client)
                 category_type_inclusion.category = category_object
                 if category_object.is_global_category():
                     self.global_categories[category_object.get_const()] = category_type_inclusion
@@ -179,6 +280,8 @@ class CMDBType:
             except CMDBNoneAPICategory as e:
                 pass
 
+        self.client.flush_metadata()
+
     def get_category_inclusion(self, category_const):
         if category_const in self.global_categories:
             return self.global_categories[category_const]
@@ -190,20 +293,96 @@ class CMDBType:
     def getCategories(self):
         return list(self.global_categories.keys()) + list(self.specific_categories.keys()) + list(self.custom_categories.keys())
 
+    def getObjectTemplate(self):
+        """
+        Return the categories of the objects of this type as immutable mapping from the
+        category constant to `(category, multi_value)`, shared by all objects of this type.
+        """
+        if self._object_template is None:
+            template = dict()
+            for category_objects in [ self.global_categories, self.specific_categories, self.custom_categories ]:
+                for category_object in category_objects.values():
+                    template[category_object.category.get_const()] = (category_object.category, category_object.multi_value)
+            self._object_template = types.MappingProxyType(template)
+        return self._object_template
+
     def getObjectStructure(self):
         """
         Initialize the structure of a type. So every category is prepared as a CMDBCategoryValues
-        Object, except for those multie value categories.
+        Object, except for those multie value categories. They are created on first access.
+
+        :rtype: CMDBObjectStructure
         """
-        values = dict()
+        return CMDBObjectStructure(self.getObjectTemplate())
 
-        for category_object in  self.global_categories.values():
-            values[category_object.category.get_const()] = getCategoryValueObject(category_object.category,category_object.multi_value)
 
-        for category_object in  self.specific_categories.values():
-            values[category_object.category.get_const()] = getCategoryValueObject(category_object.category,category_object.multi_value)
+class CMDBObjectStructure(collections.abc.MutableMapping):
+    """
+    The categories of an object, a mapping from category constant to
+    :py:class:`CMDBCategoryValues` or :py:class:`CMDBCategoryValuesList`.
 
-        for category_object in  self.custom_categories.values():
-            values[category_object.category.get_const()] = getCategoryValueObject(category_object.category,category_object.multi_value)
+    The category values are created from the template of the type when they are
+    accessed or filled for the first time, so objects of which only a few categories
+    are used don't carry empty values for all categories of their type.
 
+    :param template: the mapping returned by :py:meth:`CMDBType.getObjectTemplate`
+    """
+
+    __slots__ = ('template', '_values', '_deleted')
+
+    def __init__(self, template):
+        self.template = template
+        self._values = dict()
+        self._deleted = None
+
+    def __contains__(self, category_const):
+        if category_const in self._values:
+            return True
+        return category_const in self.template and (self._deleted is None or category_const not in self._deleted)
+
+    def __getitem__(self, category_const):
+        values = self._values.get(category_const)
+        if values is None:
+            if category_const not in self:
+                raise KeyError(category_const)
+            category, multi_value = self.template[category_const]
+            values = self._values[category_const] = getCategoryValueObject(category, multi_value)
         return values
+
+    def __setitem__(self, category_const, values):
+        self._values[category_const] = values
+        if self._deleted is not None:
+            self._deleted.discard(category_const)
+
+    def __delitem__(self, category_const):
+        if category_const not in self:
+            raise KeyError(category_const)
+        self._values.pop(category_const, None)
+        if category_const in self.template:
+            if self._deleted is None:
+                self._deleted = set()
+            self._deleted.add(category_const)
+
+    def __iter__(self):
+        for category_const in self.template:
+            if self._deleted is None or category_const not in self._deleted:
+                yield category_const
+        for category_const in self._values:
+            if category_const not in self.template:
+                yield category_const
+
+    def __len__(self):
+        extra = sum(1 for category_const in self._values if category_const not in self.template)
+        return len(self.template) - (0 if self._deleted is None else len(self._deleted)) + extra
+
+    def __repr__(self):
+        # Values which haven't been created yet are shown as placeholder, instead of creating them
+        return '{' + ', '.join('%r: %r' % (category_const, self._values[category_const]) if category_const in self._values
+                               else '%r: <not loaded>' % (category_const,) for category_const in self) + '}'
+
+    def materialized_items(self):
+        """
+        Return `(category_const, values)` of all categories whose values have been created,
+        in the order of the categories. The others are empty and unchanged.
+        """
+        return [ (category_const, self._values[category_const]) for category_const in self if category_const in self._values ]
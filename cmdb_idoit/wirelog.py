@@ -0,0 +1,116 @@
+"""
+    This file is part of cmdb_idoit.
+
+    cmdb_idoit is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    cmdb_idoit is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with cmdb_idoit.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import time
+
+_logger = None
+_handler = None
+_batch_counter = itertools.count(1)
+
+_sample_rate = 1.0
+_max_record_bytes = 64 * 1024
+
+# Values which are masked in logged bodies, e.g. the apikey.
+_secrets = set()
+
+
+def enable_wire_log(filename, sample_rate=1.0, max_bytes=10 * 1024 * 1024, backup_count=5, max_record_bytes=64 * 1024):
+    """
+    Write the traffic of the session as NDJSON records to a rotating file.
+
+    Each batch request produces a 'request' and a 'response' record sharing a batch id.
+
+    :param str filename: path of the log file
+    :param float sample_rate: fraction of batches which are logged, between 0 and 1
+    :param int max_bytes: size of the log file at which it is rotated
+    :param int backup_count: number of rotated log files to keep
+    :param int max_record_bytes: bodies longer than this are truncated
+    """
+    global _logger, _handler, _sample_rate, _max_record_bytes
+    disable_wire_log()
+
+    _sample_rate = sample_rate
+    _max_record_bytes = max_record_bytes
+
+    _handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf8')
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger('cmdb_idoit.wire')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(_handler)
+    _logger = logger
+
+
+def disable_wire_log():
+    """
+    Stop writing the wire log.
+    """
+    global _logger, _handler
+    if _handler is not None:
+        _logger.removeHandler(_handler)
+        _handler.close()
+    _logger = None
+    _handler = None
+
+
+def redact(secret):
+    """
+    Mask `secret` in all logged bodies.
+    """
+    if secret:
+        _secrets.add(secret)
+
+
+def sample():
+    """
+    Decide whether the next batch is logged.
+
+    :return: a batch id, or None when the batch is not logged
+    """
+    if _logger is None:
+        return None
+    if _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return None
+    return "%x-%x" % (os.getpid(), next(_batch_counter))
+
+
+def record(batch_id, direction, body, **fields):
+    """
+    Write one record for the batch `batch_id`.
+    """
+    logger = _logger
+    if logger is None:
+        return
+    entry = {'ts': round(time.time(), 6), 'batch': batch_id, 'dir': direction}
+    entry.update(fields)
+    entry['bytes'] = len(body)
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    for secret in _secrets:
+        body = body.replace(secret, '***')
+    if len(body) > _max_record_bytes:
+        entry['body'] = body[:_max_record_bytes]
+        entry['truncated'] = True
+    else:
+        entry['body'] = body
+    logger.info(json.dumps(entry, separators=(',', ':')))
@@ -82,6 +82,8 @@ setup(
     extras_require={
         'dev': ['check-manifest'],
         'test': ['coverage'],
+        'async': ['aiohttp>=3.0'],
+        'fast': ['orjson'],
     },
 
     # If there are data files included in your packages that need to be
@@ -103,6 +105,7 @@ setup(
     entry_points={
         'console_scripts': [
             'cmdb=cmdb_idoit.tools.cmdb:cli',
+            'cmdb-standin=cmdb_idoit.tools.standin:main',
         ],
     },
 )